@@ -1,14 +1,124 @@
 # api.py  (inside auto-Uppaal/src)
 
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import threading
+import time
 
-from pipeline import AutoPipeline  # your existing class
+from flask import Flask, Response, request, jsonify
+from flask_cors import CORS
 
 app = Flask(__name__)
 CORS(app)  # allow requests from localhost:5173 (Vite)
 
-pipeline = AutoPipeline()
+# The pipeline (LLM SDK, XML tooling, verifyta runner) and the artifact
+# store are created on first use or by prewarm(), not at import time,
+# so a worker can bind its port immediately.
+_store = None
+_pipeline = None
+_init_lock = threading.Lock()
+
+_readiness = {"ready": False, "checks": {}, "seconds": None}
+_prewarm_started = False
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _init_lock:
+            if _store is None:
+                from artifacts import ArtifactStore
+                _store = ArtifactStore()
+    return _store
+
+
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        store = get_store()
+        with _init_lock:
+            if _pipeline is None:
+                from pipeline import AutoPipeline  # your existing class
+                _pipeline = AutoPipeline(store=store)
+    return _pipeline
+
+
+# ---------------------------------------------------------
+# PRE-WARM
+# ---------------------------------------------------------
+def prewarm():
+    """
+    Load the heavy modules and exercise each dependency once:
+    - build the pipeline + artifact store (imports, regex compilation)
+    - open the LLM connection
+    - run verifyta on the forced minimal model (E<> P.S must hold)
+    /ready reports 200 once every check passed.
+    """
+    t0 = time.perf_counter()
+    checks = {}
+
+    try:
+        pipe = get_pipeline()
+        checks["modules"] = "ok"
+    except Exception as e:
+        checks["modules"] = f"error: {e}"
+        pipe = None
+
+    if pipe is not None:
+        try:
+            pipe.llm.warm()
+            checks["llm"] = "ok"
+        except Exception as e:
+            checks["llm"] = f"error: {e}"
+
+        try:
+            from verifyta_runner import run_verifyta
+            from xml_utils import force_minimal_model
+
+            # The minimal model deadlocks by design; its single location
+            # is reachable, so this query must come back satisfied
+            ok, raw, props = run_verifyta(force_minimal_model(), ["E<> P.S"], record=False)
+            checks["verifyta"] = "ok" if ok and props == [True] else f"error: {raw.strip()[:200]}"
+        except Exception as e:
+            checks["verifyta"] = f"error: {e}"
+
+    _readiness["checks"] = checks
+    _readiness["seconds"] = round(time.perf_counter() - t0, 3)
+    _readiness["ready"] = all(v == "ok" for v in checks.values())
+    return _readiness["ready"]
+
+
+def start_prewarm():
+    """
+    Run prewarm() once per process in a background thread; /ready flips
+    to 200 when it is done. Called on the first request of the process,
+    so WSGI servers (gunicorn, waitress, ...) need no extra setup; a
+    server hook can call it earlier, e.g. gunicorn's post_fork:
+
+        def post_fork(server, worker):
+            import api
+            api.start_prewarm()
+
+    (Threads do not survive fork, so it must run in the worker process.)
+    """
+    global _prewarm_started
+    with _init_lock:
+        if _prewarm_started:
+            return
+        _prewarm_started = True
+    threading.Thread(target=prewarm, daemon=True).start()
+
+
+@app.before_request
+def _warm_on_first_request():
+    if not _prewarm_started:
+        start_prewarm()
+
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness probe for load balancers / autoscalers.
+    """
+    return jsonify(_readiness), (200 if _readiness["ready"] else 503)
 
 
 @app.post("/generate")
@@ -17,36 +127,78 @@ def generate():
     JSON body:
     {
       "description": "model description text",
-      "queries": ["A[] not deadlock", "E<> P.S"]
+      "queries": ["A[] not deadlock", "E<> P.S"],
+      "inline": true,    # optional; false = only return artifact IDs
+      "profile": "auto"  # optional; verification profile (see profiles.py)
     }
     """
+    from profiles import profile_names
+
     data = request.get_json(force=True) or {}
     description = (data.get("description") or "").strip()
     queries = data.get("queries") or []
+    inline = data.get("inline", True)
+    profile = data.get("profile")
 
     if not description:
         return jsonify({"success": False, "error": "description is required"}), 400
     if not isinstance(queries, list):
         return jsonify({"success": False, "error": "queries must be a list"}), 400
+    if profile is not None and profile not in profile_names():
+        return jsonify({"success": False, "error": f"profile must be one of {profile_names()}"}), 400
     if not queries:
         # default safety property if user didn't provide any
         queries = ["A[] not deadlock"]
 
+    store = get_store()
+    run_id = store.start_run(description, queries)
+
     try:
-        ok, attempts, verifier_msg, xml = pipeline.run(description, queries)
+        ok, attempts, verifier_msg, xml = get_pipeline().run(description, queries, run_id=run_id, profile=profile)
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        # Close the run so the index does not keep it open (success NULL)
+        store.finish_run(run_id, False, None, None)
+        return jsonify({"success": False, "error": str(e), "run_id": run_id}), 500
 
-    return jsonify(
-        {
-            "success": bool(ok),
-            "attempts": attempts,
-            "xml": xml,
-            "verifier_log": verifier_msg,
-        }
-    )
+    xml_id = store.finish_run(run_id, ok, attempts, xml)
+    store.apply_retention()
+
+    body = {
+        "success": bool(ok),
+        "attempts": attempts,
+        "run_id": run_id,
+        "xml_id": xml_id,
+        "artifacts": store.run_manifest(run_id)["artifacts"],
+    }
+    if inline:
+        body["xml"] = xml
+        body["verifier_log"] = verifier_msg
+
+    return jsonify(body)
+
+
+@app.get("/runs/<run_id>")
+def get_run(run_id):
+    """
+    Run metadata plus artifact IDs (fetch contents via /artifacts/<id>).
+    """
+    manifest = get_store().run_manifest(run_id)
+    if manifest is None:
+        return jsonify({"success": False, "error": "unknown run"}), 404
+    return jsonify(manifest)
+
+
+@app.get("/artifacts/<digest>")
+def get_artifact(digest):
+    data = get_store().get_blob(digest)
+    if data is None:
+        return jsonify({"success": False, "error": "unknown artifact"}), 404
+    return Response(data, mimetype="text/plain; charset=utf-8")
 
 
 if __name__ == "__main__":
+    # Warm up in the background; /ready flips to 200 when done
+    start_prewarm()
+
     # Run on http://localhost:5000
     app.run(host="127.0.0.1", port=5000, debug=True)
@@ -0,0 +1,285 @@
+# artifacts.py
+
+"""
+Artifact store for pipeline runs.
+
+- SQLite index (runs + per-attempt artifacts)
+- content-addressed blob directory (sha256 of the raw content)
+- blobs compressed with zstd when `zstandard` is installed, gzip otherwise
+- identical blobs (same prompt, same verifier log, ...) are stored once
+- retention policy: keep the newest N runs / runs younger than D days,
+  then garbage-collect blobs nobody references anymore
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+
+from config import ARTIFACT_DIR, ARTIFACT_RETENTION_RUNS, ARTIFACT_RETENTION_DAYS
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest      TEXT PRIMARY KEY,
+    codec       TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    created     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id          TEXT PRIMARY KEY,
+    created     REAL NOT NULL,
+    description TEXT NOT NULL,
+    queries     TEXT NOT NULL,
+    success     INTEGER,
+    attempts    INTEGER,
+    final_xml   TEXT
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id      TEXT NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    attempt     INTEGER NOT NULL,
+    kind        TEXT NOT NULL,
+    digest      TEXT NOT NULL REFERENCES blobs(digest)
+);
+CREATE INDEX IF NOT EXISTS artifacts_run ON artifacts(run_id);
+CREATE INDEX IF NOT EXISTS artifacts_digest ON artifacts(digest);
+CREATE INDEX IF NOT EXISTS runs_created ON runs(created);
+"""
+
+
+# ============================================================
+#                     COMPRESSION
+# ============================================================
+
+def _compress(data: bytes):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "gzip", gzip.compress(data, compresslevel=6)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _as_bytes(data) -> bytes:
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    # parsed properties, manifests, ...
+    return json.dumps(data, sort_keys=True).encode("utf-8")
+
+
+# ============================================================
+#                     ARTIFACT STORE
+# ============================================================
+
+class ArtifactStore:
+
+    def __init__(self, root: str = ARTIFACT_DIR):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        self.db_path = os.path.join(root, "index.sqlite")
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+        with closing(self._connect()) as db, db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        # One connection per call keeps the store usable from Flask threads
+        db = sqlite3.connect(self.db_path, timeout=30)
+        db.execute("PRAGMA foreign_keys = ON")
+        return db
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    # ---------------------------------------------------------
+    # BLOBS
+    # ---------------------------------------------------------
+    def _store_blob(self, db, data) -> str:
+        """
+        Insert a blob inside the caller's write transaction (see _write);
+        the caller adds its reference in the same transaction, so
+        apply_retention can never see the blob unreferenced.
+        """
+        raw = _as_bytes(data)
+        digest = hashlib.sha256(raw).hexdigest()
+
+        if db.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone():
+            return digest
+
+        codec, packed = _compress(raw)
+        path = self._blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(packed)
+        os.replace(tmp, path)
+
+        db.execute(
+            "INSERT OR IGNORE INTO blobs (digest, codec, size, stored_size, created) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (digest, codec, len(raw), len(packed), time.time()),
+        )
+        return digest
+
+    def _write(self):
+        """
+        Connection with an open write transaction. BEGIN IMMEDIATE takes
+        the database write lock up front, which serialises blob writers
+        against apply_retention.
+        """
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        return db
+
+    def get_blob(self, digest: str):
+        """
+        Raw (decompressed) content, or None if unknown.
+        """
+        if not _DIGEST_RE.match(digest or ""):
+            return None
+
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT codec FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            return None
+
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                return _decompress(row[0], f.read())
+        except FileNotFoundError:
+            return None
+
+    # ---------------------------------------------------------
+    # RUNS
+    # ---------------------------------------------------------
+    def start_run(self, description: str, queries: list[str]) -> str:
+        run_id = uuid.uuid4().hex
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "INSERT INTO runs (id, created, description, queries) VALUES (?, ?, ?, ?)",
+                (run_id, time.time(), description, json.dumps(queries)),
+            )
+        return run_id
+
+    def record(self, run_id: str, attempt: int, kind: str, data) -> str:
+        """
+        Attach one artifact (prompt, llm_output, xml, verifier_log,
+        properties, ...) to an attempt of a run.
+        """
+        with closing(self._write()) as db, db:
+            digest = self._store_blob(db, data)
+            db.execute(
+                "INSERT INTO artifacts (run_id, attempt, kind, digest) VALUES (?, ?, ?, ?)",
+                (run_id, attempt, kind, digest),
+            )
+        return digest
+
+    def finish_run(self, run_id: str, success: bool, attempts: int, xml) -> str:
+        """
+        Store the outcome of a run; xml None (the pipeline raised) leaves
+        final_xml empty and returns None.
+        """
+        with closing(self._write()) as db, db:
+            digest = None if xml is None else self._store_blob(db, xml)
+            db.execute(
+                "UPDATE runs SET success = ?, attempts = ?, final_xml = ? WHERE id = ?",
+                (int(bool(success)), attempts, digest, run_id),
+            )
+        return digest
+
+    def run_manifest(self, run_id: str):
+        """
+        Run metadata plus the list of artifact IDs; None if unknown.
+        """
+        with closing(self._connect()) as db:
+            run = db.execute(
+                "SELECT created, description, queries, success, attempts, final_xml "
+                "FROM runs WHERE id = ?",
+                (run_id,),
+            ).fetchone()
+            if run is None:
+                return None
+
+            rows = db.execute(
+                "SELECT a.attempt, a.kind, a.digest, b.size, b.stored_size "
+                "FROM artifacts a JOIN blobs b ON b.digest = a.digest "
+                "WHERE a.run_id = ? ORDER BY a.id",
+                (run_id,),
+            ).fetchall()
+
+        created, description, queries, success, attempts, final_xml = run
+        return {
+            "run_id": run_id,
+            "created": created,
+            "description": description,
+            "queries": json.loads(queries),
+            "success": None if success is None else bool(success),
+            "attempts": attempts,
+            "final_xml": final_xml,
+            "artifacts": [
+                {"attempt": a, "kind": k, "id": d, "size": s, "stored_size": ss}
+                for a, k, d, s, ss in rows
+            ],
+        }
+
+    # ---------------------------------------------------------
+    # RETENTION
+    # ---------------------------------------------------------
+    def apply_retention(self, max_runs: int = ARTIFACT_RETENTION_RUNS,
+                        max_age_days: float = ARTIFACT_RETENTION_DAYS):
+        """
+        Drop runs beyond the newest `max_runs` or older than `max_age_days`,
+        then delete blobs that are no longer referenced. Returns
+        (runs_deleted, blobs_deleted).
+
+        Runs under the write lock, files included, so a concurrent
+        record() cannot re-create a blob between the row and file delete.
+        """
+        cutoff = time.time() - max_age_days * 86400
+
+        with closing(self._write()) as db, db:
+            cur = db.execute(
+                "DELETE FROM runs WHERE created < ? OR id NOT IN "
+                "(SELECT id FROM runs ORDER BY created DESC LIMIT ?)",
+                (cutoff, max_runs),
+            )
+            runs_deleted = cur.rowcount
+
+            orphans = [
+                d for (d,) in db.execute(
+                    "SELECT digest FROM blobs WHERE digest NOT IN "
+                    "(SELECT digest FROM artifacts) AND digest NOT IN "
+                    "(SELECT final_xml FROM runs WHERE final_xml IS NOT NULL)"
+                )
+            ]
+            db.executemany("DELETE FROM blobs WHERE digest = ?", [(d,) for d in orphans])
+
+            for digest in orphans:
+                try:
+                    os.remove(self._blob_path(digest))
+                except FileNotFoundError:
+                    pass
+
+        return runs_deleted, len(orphans)
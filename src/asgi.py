@@ -0,0 +1,249 @@
+# asgi.py  (inside auto-Uppaal/src)
+
+"""
+ASGI entry point, an asyncio alternative to the Flask app in api.py:
+
+    uvicorn asgi:app --host 127.0.0.1 --port 5000
+
+Same endpoints and JSON contract as api.py (/generate, /ready,
+/runs/<run_id>, /artifacts/<digest>), but jobs run as coroutines on
+AsyncAutoPipeline, so concurrent requests do not each hold a thread
+while waiting on the LLM or verifyta. If the client disconnects before
+the result is ready, the job is cancelled.
+
+Plain ASGI, no framework: the only runtime dependency is the server.
+"""
+
+import asyncio
+import json
+import time
+
+# Created on first use or during lifespan startup (see api.py)
+_store = None
+_pipeline = None
+
+_readiness = {"ready": False, "checks": {}, "seconds": None}
+
+_CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+    (b"access-control-allow-headers", b"Content-Type"),
+]
+
+
+def get_store():
+    global _store
+    if _store is None:
+        from artifacts import ArtifactStore
+        _store = ArtifactStore()
+    return _store
+
+
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        from async_pipeline import AsyncAutoPipeline
+        _pipeline = AsyncAutoPipeline(store=get_store())
+    return _pipeline
+
+
+# ---------------------------------------------------------
+# PRE-WARM
+# ---------------------------------------------------------
+async def prewarm():
+    """
+    Same checks as api.prewarm (modules, llm, verifyta), without blocking
+    the event loop.
+    """
+    t0 = time.perf_counter()
+    checks = {}
+
+    try:
+        pipe = get_pipeline()
+        checks["modules"] = "ok"
+    except Exception as e:
+        checks["modules"] = f"error: {e}"
+        pipe = None
+
+    if pipe is not None:
+        try:
+            await asyncio.to_thread(lambda: pipe.llm.warm())
+            checks["llm"] = "ok"
+        except Exception as e:
+            checks["llm"] = f"error: {e}"
+
+        try:
+            from verifyta_runner import run_verifyta_async
+            from xml_utils import force_minimal_model
+
+            ok, raw, props = await run_verifyta_async(force_minimal_model(), ["E<> P.S"], record=False)
+            checks["verifyta"] = "ok" if ok and props == [True] else f"error: {raw.strip()[:200]}"
+        except Exception as e:
+            checks["verifyta"] = f"error: {e}"
+
+    _readiness["checks"] = checks
+    _readiness["seconds"] = round(time.perf_counter() - t0, 3)
+    _readiness["ready"] = all(v == "ok" for v in checks.values())
+    return _readiness["ready"]
+
+
+# ---------------------------------------------------------
+# HTTP HELPERS
+# ---------------------------------------------------------
+async def _send(send, status, body, content_type=b"application/json"):
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())] + _CORS_HEADERS,
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _until_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+# ---------------------------------------------------------
+# ENDPOINTS
+# ---------------------------------------------------------
+async def generate(receive, send):
+    """
+    JSON body: same as api.generate.
+    """
+    from profiles import profile_names
+
+    raw = await _read_body(receive)
+    if raw is None:
+        return
+
+    try:
+        data = json.loads(raw or b"{}") or {}
+    except ValueError:
+        return await _send(send, 400, {"success": False, "error": "invalid JSON"})
+
+    description = (data.get("description") or "").strip()
+    queries = data.get("queries") or []
+    inline = data.get("inline", True)
+    profile = data.get("profile")
+
+    if not description:
+        return await _send(send, 400, {"success": False, "error": "description is required"})
+    if not isinstance(queries, list):
+        return await _send(send, 400, {"success": False, "error": "queries must be a list"})
+    if profile is not None and profile not in profile_names():
+        return await _send(send, 400, {"success": False, "error": f"profile must be one of {profile_names()}"})
+    if not queries:
+        # default safety property if user didn't provide any
+        queries = ["A[] not deadlock"]
+
+    store = get_store()
+    run_id = await asyncio.to_thread(store.start_run, description, queries)
+
+    job = asyncio.create_task(get_pipeline().run_async(description, queries, run_id=run_id, profile=profile))
+    watcher = asyncio.create_task(_until_disconnect(receive))
+    await asyncio.wait({job, watcher}, return_when=asyncio.FIRST_COMPLETED)
+
+    if not job.done():
+        # Client went away: nobody will read the result
+        job.cancel()
+        print(f"[INFO] Client disconnected; cancelled run {run_id}.")
+        return
+    watcher.cancel()
+
+    try:
+        ok, attempts, verifier_msg, xml = job.result()
+    except Exception as e:
+        # Close the run so the index does not keep it open (success NULL)
+        await asyncio.to_thread(store.finish_run, run_id, False, None, None)
+        return await _send(send, 500, {"success": False, "error": str(e), "run_id": run_id})
+
+    def finish():
+        xml_id = store.finish_run(run_id, ok, attempts, xml)
+        store.apply_retention()
+        return xml_id, store.run_manifest(run_id)["artifacts"]
+
+    xml_id, artifacts = await asyncio.to_thread(finish)
+
+    body = {
+        "success": bool(ok),
+        "attempts": attempts,
+        "run_id": run_id,
+        "xml_id": xml_id,
+        "artifacts": artifacts,
+    }
+    if inline:
+        body["xml"] = xml
+        body["verifier_log"] = verifier_msg
+
+    await _send(send, 200, body)
+
+
+async def get_run(send, run_id):
+    manifest = await asyncio.to_thread(get_store().run_manifest, run_id)
+    if manifest is None:
+        return await _send(send, 404, {"success": False, "error": "unknown run"})
+    await _send(send, 200, manifest)
+
+
+async def get_artifact(send, digest):
+    data = await asyncio.to_thread(get_store().get_blob, digest)
+    if data is None:
+        return await _send(send, 404, {"success": False, "error": "unknown artifact"})
+    await _send(send, 200, data, content_type=b"text/plain; charset=utf-8")
+
+
+# ---------------------------------------------------------
+# ASGI APP
+# ---------------------------------------------------------
+async def _lifespan(receive, send):
+    warmup = None
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Warm up in the background; /ready flips to 200 when done
+            warmup = asyncio.create_task(prewarm())
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if warmup is not None and not warmup.done():
+                warmup.cancel()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    method, path = scope["method"], scope["path"].rstrip("/") or "/"
+
+    if method == "OPTIONS":
+        # CORS preflight
+        return await _send(send, 204, b"")
+    if method == "GET" and path == "/ready":
+        return await _send(send, 200 if _readiness["ready"] else 503, _readiness)
+    if method == "POST" and path == "/generate":
+        return await generate(receive, send)
+    if method == "GET" and path.startswith("/runs/"):
+        return await get_run(send, path[len("/runs/"):])
+    if method == "GET" and path.startswith("/artifacts/"):
+        return await get_artifact(send, path[len("/artifacts/"):])
+
+    await _send(send, 404, {"success": False, "error": "not found"})
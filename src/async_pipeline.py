@@ -0,0 +1,139 @@
+# async_pipeline.py
+
+"""
+asyncio variant of AutoPipeline for the ASGI entry point (asgi.py).
+
+Same generate / verify / repair loop and the same artifacts, but each
+job is a coroutine: LLM calls and verifyta runs are awaited instead of
+blocking a worker thread, so one process can keep many jobs in flight.
+Everything that parses the model or touches the disk (XML repair and
+sanitising, fragment extraction / splicing, slicing, pre-check, artifact
+writes, verifyta input files) runs in worker threads.
+
+Cancelling the task (e.g. the client disconnected) stops the job at the
+next await point; a running verifyta process is killed.
+"""
+
+import asyncio
+import time
+
+from config import PARTIAL_REPAIR, PROFILE_ATTEMPTS
+from partial_repair import locate_failing_fragments, extract_fragments, splice_fragments
+from pipeline import AutoPipeline, MAX_ATTEMPTS, _wants_forced_model, _print_attempt
+from prompts import build_generator_prompt, build_repair_prompt, build_partial_repair_prompt
+from traces import diff_properties
+from xml_utils import (
+    sanitize_xml,
+    force_minimal_model,
+    validate_and_repair_xml_bytes,
+)
+from verifyta_runner import verify_model_async
+
+
+class AsyncAutoPipeline(AutoPipeline):
+
+    async def _record_async(self, run_id, attempt, kind, data):
+        if self.store is not None and run_id is not None:
+            await asyncio.to_thread(self.store.record, run_id, attempt, kind, data)
+
+    # ---------------------------------------------------------
+    # MODEL GENERATION
+    # ---------------------------------------------------------
+    async def generate_xml_async(self, description, queries, run_id=None):
+        if _wants_forced_model(description):
+            print("\n[INFO] Using forced Minimal model (bypassing LLM).")
+            return force_minimal_model()
+
+        prompt = build_generator_prompt(description, queries)
+        xml = await self.llm.ask_async(prompt, purpose="generate")
+        await self._record_async(run_id, 1, "prompt", prompt)
+        await self._record_async(run_id, 1, "llm_output", xml)
+        return await asyncio.to_thread(sanitize_xml, xml)
+
+    # ---------------------------------------------------------
+    # MODEL REPAIR
+    # ---------------------------------------------------------
+    async def repair_xml_async(self, broken_xml, msg, queries, run_id=None, attempt=None, progress=""):
+        if isinstance(broken_xml, bytes):
+            broken_xml = broken_xml.decode("utf-8")
+
+        if PARTIAL_REPAIR:
+            xml = await self.repair_fragments_async(broken_xml, msg, queries, run_id=run_id, attempt=attempt)
+            if xml is not None:
+                return xml
+
+        prompt = build_repair_prompt(broken_xml, msg, queries, progress)
+        xml = await self.llm.ask_async(prompt, purpose="repair")
+        await self._record_async(run_id, attempt, "prompt", prompt)
+        await self._record_async(run_id, attempt, "llm_output", xml)
+        return await asyncio.to_thread(sanitize_xml, xml)
+
+    async def repair_fragments_async(self, broken_xml, msg, queries, run_id=None, attempt=None):
+        """
+        asyncio counterpart of AutoPipeline.repair_fragments.
+        """
+        targets = await asyncio.to_thread(locate_failing_fragments, broken_xml, msg)
+        if not targets:
+            return None
+
+        fragments, summary = await asyncio.to_thread(extract_fragments, broken_xml, targets)
+        prompt = build_partial_repair_prompt(fragments, summary, msg, queries)
+        reply = await self.llm.ask_async(prompt, purpose="repair_partial")
+        await self._record_async(run_id, attempt, "prompt", prompt)
+        await self._record_async(run_id, attempt, "llm_output", reply)
+
+        xml = await asyncio.to_thread(splice_fragments, broken_xml, targets, reply)
+        if xml is None:
+            print("[INFO] Partial repair reply could not be spliced; falling back to full repair.")
+            return None
+
+        print(f"[INFO] Partial repair of {', '.join(k if i is None else f'{k}[{i}]' for k, i in targets)}.")
+        return xml
+
+    # ---------------------------------------------------------
+    # MAIN LOOP
+    # ---------------------------------------------------------
+    async def run_async(self, description, queries, run_id=None, profile=None):
+        """
+        Same contract as AutoPipeline.run:
+        returns (ok, attempts, verifier_log, xml).
+        """
+        xml = await self.generate_xml_async(description, queries, run_id=run_id)
+        prev_props = None
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+
+            # tracemalloc is process-wide and meaningless with concurrent
+            # jobs, so only wall-clock timings are reported here
+            t0 = time.perf_counter()
+
+            xml_checked = await asyncio.to_thread(validate_and_repair_xml_bytes, xml, queries)
+            t1 = time.perf_counter()
+
+            ok, raw, props = await verify_model_async(xml_checked, queries, profile)
+            t2 = time.perf_counter()
+
+            if PROFILE_ATTEMPTS:
+                print(
+                    f"[PERF] attempt {attempt}: {len(xml_checked)} bytes, "
+                    f"repair {(t1 - t0) * 1000:.1f} ms, "
+                    f"verify {(t2 - t1) * 1000:.1f} ms"
+                )
+
+            await self._record_async(run_id, attempt, "xml", xml_checked)
+            await self._record_async(run_id, attempt, "verifier_log", raw)
+            await self._record_async(run_id, attempt, "properties", props)
+
+            _print_attempt(attempt, raw, props)
+
+            if ok:
+                return True, attempt, raw, xml_checked.decode("utf-8")
+
+            progress = diff_properties(queries, prev_props, props)
+            prev_props = props
+            xml = await self.repair_xml_async(
+                xml_checked, raw, queries, run_id=run_id, attempt=attempt + 1, progress=progress
+            )
+
+        last = await asyncio.to_thread(validate_and_repair_xml_bytes, xml, queries)
+        return False, MAX_ATTEMPTS, raw, last.decode("utf-8")
@@ -0,0 +1,573 @@
+# benchmarks.py
+
+"""
+Micro-benchmarks for the Auto-UPPAAL backend.
+
+Usage:
+    python benchmarks.py labels
+    python benchmarks.py xml
+    python benchmarks.py startup
+    python benchmarks.py simulator
+    python benchmarks.py load
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+from labels import (
+    fix_identifier,
+    normalize_assignment_text,
+    normalize_model_labels,
+)
+from xml_utils import HAVE_LXML, validate_and_repair_xml, validate_and_repair_xml_bytes
+
+
+def _timeit(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return time.perf_counter() - t0
+
+
+def _measure(fn):
+    """
+    Returns (seconds, peak_bytes) for a single call.
+    """
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+# ============================================================
+#          LABEL NORMALISATION (legacy vs engine)
+# ============================================================
+
+# Verbatim copies of the per-label normalisers that lived in xml_utils.py,
+# kept here as the baseline.
+
+def _legacy_fix_identifier(name: str) -> str:
+    if not name:
+        return "X"
+    name = re.sub(r"[^A-Za-z0-9_]", "_", name)
+    if not re.match(r"[A-Za-z_]", name[0]):
+        name = "X" + name
+    return name
+
+
+def _legacy_guard(label):
+    if label.text:
+        label.text = re.sub(r"[^A-Za-z0-9_<>=+*/!&| \t-]", "", label.text.strip())
+
+
+def _legacy_assignment(label):
+    txt = (label.text or "").strip()
+    if not txt:
+        label.text = None
+        return
+    txt = txt.replace(";", "")
+    txt = re.sub(r"[^A-Za-z0-9_=+\-*/ \t]", "", txt)
+    m = re.match(r"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*=\s*([0-9]+)\s*$", txt)
+    if not m:
+        label.text = None
+        return
+    var, val = m.groups()
+    label.text = f"{var} = {val}"
+
+
+def _legacy_sync(label):
+    text = (label.text or "").strip()
+    text = re.sub(r"[^A-Za-z0-9!?_]", "", text)
+    if "!" not in text and "?" not in text:
+        text += "!"
+    label.text = text
+
+
+def _legacy_model_labels(root):
+    for tmpl in root.findall("template"):
+        for trans in tmpl.findall("transition"):
+            for label in list(trans.findall("label")):
+                kind = label.get("kind")
+                if kind == "guard":
+                    _legacy_guard(label)
+                elif kind == "assignment":
+                    _legacy_assignment(label)
+                elif kind == "synchronisation":
+                    _legacy_sync(label)
+                if not label.text or not label.text.strip():
+                    trans.remove(label)
+
+
+_SAMPLE_LABELS = [
+    ("guard", "x >= 3 && y < 10"),
+    ("guard", " count == N "),
+    ("synchronisation", " req ! "),
+    ("synchronisation", "ack?"),
+    ("assignment", "x = 0"),
+    ("assignment", "x := 0, y = y + 1"),
+    ("assignment", "buf[i] = 1; i++"),
+    ("assignment", "t = 0"),
+]
+
+
+def _label_model(templates: int, transitions: int) -> str:
+    parts = ["<nta><declaration></declaration>"]
+    for t in range(templates):
+        parts.append(f"<template><name>T{t}</name>")
+        parts.append('<location id="id0"><name>A</name></location><init ref="id0"/>')
+        for i in range(transitions):
+            kind, text = _SAMPLE_LABELS[i % len(_SAMPLE_LABELS)]
+            parts.append(
+                '<transition><source ref="id0"/><target ref="id0"/>'
+                f'<label kind="{kind}">{escape(text)}</label></transition>'
+            )
+        parts.append("</template>")
+    parts.append("</nta>")
+    return "".join(parts)
+
+
+def bench_labels(templates: int = 20, transitions: int = 200, repeat: int = 20):
+    xml = _label_model(templates, transitions)
+    n_labels = templates * transitions
+
+    # Parsing is identical for both variants, so it is done up front
+    legacy_roots = [ET.fromstring(xml) for _ in range(repeat)]
+    engine_roots = [ET.fromstring(xml) for _ in range(repeat)]
+
+    legacy = _timeit(lambda: _legacy_model_labels(legacy_roots.pop()), repeat)
+    engine = _timeit(lambda: normalize_model_labels(engine_roots.pop()), repeat)
+
+    print(f"labels per model: {n_labels}, models: {repeat}")
+    print(f"legacy per-label re.sub : {legacy * 1000:8.2f} ms")
+    print(f"batch engine            : {engine * 1000:8.2f} ms")
+    print(f"speedup                 : {legacy / engine:8.2f}x")
+
+    names = [f"loc-{i}.é" for i in range(1000)]
+    legacy = _timeit(lambda: [_legacy_fix_identifier(n) for n in names], repeat)
+    engine = _timeit(lambda: [fix_identifier(n) for n in names], repeat)
+    print(f"fix_identifier legacy   : {legacy * 1000:8.2f} ms")
+    print(f"fix_identifier engine   : {engine * 1000:8.2f} ms")
+
+    # Single-text normalisers without memoisation hits
+    texts = [f"x{i} := {i}, a[{i}] = y + {i}" for i in range(1000)]
+    normalize_assignment_text.cache_clear()
+    engine = _timeit(lambda: [normalize_assignment_text(t + " ") for t in texts], 1)
+    print(f"cold assignment engine  : {engine * 1000:8.2f} ms (1000 distinct labels)")
+
+
+# ============================================================
+#        XML REPAIR + SERIALISATION (str vs bytes path)
+# ============================================================
+
+def bench_xml(templates: int = 30, transitions: int = 500):
+    """
+    One pipeline attempt on a large model: repair, write the verifyta
+    input file, embed in the API response.
+    """
+    xml = _label_model(templates, transitions)
+    print(f"model: {len(xml) / 1024:.0f} KiB, lxml: {'yes' if HAVE_LXML else 'no'}")
+
+    def str_path():
+        checked = validate_and_repair_xml(xml, [])
+        f = io.BytesIO()
+        f.write(checked.encode("utf-8"))
+        return checked
+
+    def bytes_path():
+        checked = validate_and_repair_xml_bytes(xml, [])
+        f = io.BytesIO()
+        f.write(checked)
+        return checked
+
+    for name, fn in (("str round-trip", str_path), ("bytes", bytes_path)):
+        elapsed, peak = _measure(fn)
+        print(f"{name:18}: {elapsed * 1000:8.2f} ms, peak {peak / 1024:8.0f} KiB")
+
+
+# ============================================================
+#            STARTUP (cold import, first /generate)
+# ============================================================
+
+_STARTUP_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+import api
+t_import = time.perf_counter() - t0
+if sys.argv[1] == "prewarm":
+    api.prewarm()
+t_warm = time.perf_counter() - t0
+res = api.app.test_client().post("/generate", json={
+    "description": "minimal model with no transitions",
+    "queries": ["A[] not deadlock"],
+})
+t_first = time.perf_counter() - t0
+print(json.dumps({"import": t_import, "warm": t_warm, "first": t_first,
+                  "status": res.status_code, "success": (res.get_json() or {}).get("success")}))
+"""
+
+
+def bench_startup():
+    """
+    Each measurement runs in a fresh interpreter (cold imports). The first
+    /generate uses the forced minimal model, so no LLM call is involved,
+    but verifyta and Flask must be installed.
+    """
+    src = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=src + os.pathsep + os.environ.get("PYTHONPATH", ""))
+
+    for mode in ("lazy", "prewarm"):
+        with tempfile.TemporaryDirectory() as cwd:
+            proc = subprocess.run(
+                [sys.executable, "-c", _STARTUP_SCRIPT, mode],
+                cwd=cwd, env=env, capture_output=True, text=True,
+            )
+        if proc.returncode != 0:
+            print(f"{mode}: failed\n{proc.stderr.strip()[-500:]}")
+            continue
+
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(
+            f"{mode:8}: import {r['import'] * 1000:7.1f} ms, "
+            f"ready {r['warm'] * 1000:7.1f} ms, "
+            f"first /generate {r['first'] * 1000:7.1f} ms "
+            f"(HTTP {r['status']}, success={r['success']})"
+        )
+
+
+# ============================================================
+#       IN-PROCESS EXPLORER vs verifyta (small test corpus)
+# ============================================================
+
+_HANDSHAKE = """<nta>
+<declaration>chan go; int x;</declaration>
+<template><name>A</name>
+  <location id="a0"><name>idle</name></location>
+  <location id="a1"><name>busy</name></location>
+  <init ref="a0"/>
+  <transition><source ref="a0"/><target ref="a1"/>
+    <label kind="guard">x &lt; 3</label>
+    <label kind="synchronisation">go!</label>
+    <label kind="assignment">x++</label></transition>
+  <transition><source ref="a1"/><target ref="a0"/></transition>
+</template>
+<template><name>B</name>
+  <location id="b0"><name>wait</name></location>
+  <location id="b1"><name>got</name></location>
+  <init ref="b0"/>
+  <transition><source ref="b0"/><target ref="b1"/>
+    <label kind="synchronisation">go?</label></transition>
+  <transition><source ref="b1"/><target ref="b0"/></transition>
+</template>
+<system>P0 = A();
+P1 = B();
+system P0, P1;</system>
+</nta>"""
+
+_COMMITTED = """<nta>
+<declaration>const int N = 4; int[0,N] n = 0; bool done = false;</declaration>
+<template><name>Counter</name>
+  <declaration>int steps;</declaration>
+  <location id="c0"><name>count</name></location>
+  <location id="c1"><name>check</name><committed/></location>
+  <location id="c2"><name>stop</name></location>
+  <init ref="c0"/>
+  <transition><source ref="c0"/><target ref="c1"/>
+    <label kind="guard">n &lt; N</label>
+    <label kind="assignment">n = n + 1, steps += 2</label></transition>
+  <transition><source ref="c1"/><target ref="c0"/>
+    <label kind="guard">n != N</label></transition>
+  <transition><source ref="c1"/><target ref="c2"/>
+    <label kind="guard">n == N</label>
+    <label kind="assignment">done = true</label></transition>
+  <transition><source ref="c2"/><target ref="c2"/></transition>
+</template>
+<template><name>Observer</name>
+  <location id="o0"><name>watch</name></location>
+  <location id="o1"><name>seen</name></location>
+  <init ref="o0"/>
+  <transition><source ref="o0"/><target ref="o1"/>
+    <label kind="guard">done</label></transition>
+</template>
+<system>P0 = Counter();
+P1 = Observer();
+system P0, P1;</system>
+</nta>"""
+
+_TIMED = """<nta>
+<declaration>clock t;</declaration>
+<template><name>T</name>
+  <location id="t0"><name>A</name><label kind="invariant">t &lt;= 5</label></location>
+  <location id="t1"><name>B</name></location>
+  <init ref="t0"/>
+  <transition><source ref="t0"/><target ref="t1"/>
+    <label kind="guard">t &gt;= 2</label></transition>
+</template>
+<system>P = T();
+system P;</system>
+</nta>"""
+
+# (name, xml, [(query, expected)]) -- expected None = must fall back
+SIMULATOR_CORPUS = [
+    ("minimal", None, [
+        ("A[] not deadlock", False),
+        ("E<> P.S", True),
+    ]),
+    ("handshake", _HANDSHAKE, [
+        ("E<> P0.busy and P1.got", True),
+        ("A[] x <= 3", True),
+        ("E<> x == 4", False),
+        ("A[] not deadlock", False),
+        ("E<> deadlock and x == 3", True),
+        ("P0.busy --> P1.wait", None),
+    ]),
+    ("committed", _COMMITTED, [
+        ("E<> P1.seen", True),
+        ("A[] P0.steps == 2 * n", True),
+        ("A[] not (P0.check and P1.seen)", True),
+        ("A[] not deadlock", True),
+        ("E<> n > N", False),
+    ]),
+    ("timed", _TIMED, [
+        ("E<> P.B", None),
+        ("A[] not deadlock", None),
+    ]),
+]
+
+
+def bench_simulator(max_states: int = 200_000):
+    """
+    Checks the explorer against expected results (and against verifyta
+    when it is installed) and times both.
+    """
+    from config import VERIFYTA_PATH
+    from simulator import precheck
+    from verifyta_runner import run_verifyta
+    from xml_utils import force_minimal_model
+
+    have_verifyta = os.path.exists(VERIFYTA_PATH)
+    mismatches = 0
+
+    for name, xml, cases in SIMULATOR_CORPUS:
+        xml = xml or force_minimal_model()
+        queries = [q for q, _ in cases]
+
+        t0 = time.perf_counter()
+        got = precheck(xml, queries, max_states)
+        t_sim = time.perf_counter() - t0
+
+        ref = None
+        if have_verifyta:
+            t0 = time.perf_counter()
+            ref = [run_verifyta(xml, [q])[2] for q in queries]
+            t_ver = time.perf_counter() - t0
+            print(f"{name}: explorer {t_sim * 1000:.1f} ms, verifyta {t_ver * 1000:.1f} ms")
+        else:
+            print(f"{name}: explorer {t_sim * 1000:.1f} ms (verifyta not installed)")
+
+        for i, (q, expected) in enumerate(cases):
+            status = "ok"
+            if got[i] != expected:
+                status = "MISMATCH (expected)"
+            elif ref is not None and got[i] is not None and ref[i] != [got[i]]:
+                status = f"MISMATCH (verifyta says {ref[i]})"
+            if status != "ok":
+                mismatches += 1
+            print(f"  {q:40} -> {str(got[i]):5} {status}")
+
+    print(f"mismatches: {mismatches}")
+
+
+# ============================================================
+#          LOAD: Flask (threads) vs ASGI (asyncio)
+# ============================================================
+
+def _stub_llm(delay: float, reply: str):
+    """
+    Local OpenAI-compatible server that answers every completion with
+    `reply` after `delay` seconds (simulated model latency).
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    body = json.dumps({
+        "choices": [{"message": {"content": reply}}],
+        "usage": {"completion_tokens": len(reply) // 4},
+    }).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def _asgi_call(app, method, path, payload):
+    body = json.dumps(payload).encode("utf-8")
+    scope = {"type": "http", "method": method, "path": path, "headers": []}
+    sent = [False]
+    done = asyncio.Event()
+    response = {}
+
+    async def receive():
+        if not sent[0]:
+            sent[0] = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"] = message.get("body", b"")
+            done.set()
+
+    await app(scope, receive, send)
+    return response["status"], json.loads(response["body"] or b"{}")
+
+
+# Stands in for verifyta when it is not installed: every formula of the
+# query file (last argument) is reported satisfied
+_STUB_VERIFYTA = """#!{python}
+import sys
+with open(sys.argv[-1], encoding="utf-8") as f:
+    queries = [q for q in f.read().splitlines() if q.strip()]
+for i, _ in enumerate(queries, start=1):
+    print(f"Verifying formula {{i}} at stub:{{i}}")
+    print(" -- Formula is satisfied.")
+"""
+
+
+def bench_load(jobs: int = 32, delay: float = 0.5, workers: int = 8):
+    """
+    `jobs` concurrent /generate requests against a stub LLM with `delay`
+    seconds of latency. Satisfied results are always confirmed by
+    verifyta; when it is not installed, a stub script that reports every
+    formula satisfied is used instead (POSIX only).
+    Flask is driven by `workers` threads (a typical threaded WSGI
+    server); the ASGI app runs every job as a coroutine.
+    """
+    import api
+    import asgi
+    import profiles
+    import verifyta_runner
+    from artifacts import ArtifactStore
+    from async_pipeline import AsyncAutoPipeline
+    from llm_client import LLMClient
+    from llm_providers import OpenAICompatProvider
+    from pipeline import AutoPipeline
+    from concurrent.futures import ThreadPoolExecutor
+
+    stub_dir = tempfile.mkdtemp()
+    # Keep benchmark runs out of the real profile stats
+    profiles._stats = profiles.ProfileStats(os.path.join(stub_dir, "profiles.sqlite"))
+
+    if not os.path.exists(verifyta_runner.VERIFYTA_PATH):
+        if os.name != "posix":
+            print("verifyta not installed; skipped")
+            shutil.rmtree(stub_dir, ignore_errors=True)
+            return
+        stub = os.path.join(stub_dir, "verifyta")
+        with open(stub, "w", encoding="utf-8") as f:
+            f.write(_STUB_VERIFYTA.format(python=sys.executable))
+        os.chmod(stub, 0o755)
+        verifyta_runner.VERIFYTA_PATH = stub
+        print("verifyta not installed; using a stub that reports every formula satisfied")
+
+    server = _stub_llm(delay, _HANDSHAKE)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    payload = {
+        "description": "two processes handshaking on a channel",
+        "queries": ["E<> P1.got", "A[] x <= 3"],
+        "inline": False,
+    }
+
+    def client():
+        return LLMClient(providers=[OpenAICompatProvider(base_url, "stub")])
+
+    def report(name, elapsed, statuses):
+        good = statuses.count(200)
+        print(
+            f"{name:6}: {jobs} jobs in {elapsed:6.2f} s, "
+            f"{jobs / elapsed:6.1f} jobs/s ({good}/{jobs} HTTP 200)"
+        )
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ArtifactStore(root=os.path.join(tmp, "flask"))
+            api._store = store
+            api._pipeline = AutoPipeline(store=store)
+            api._pipeline._llm = client()
+            http = api.app.test_client
+
+            def flask_job(_):
+                return http().post("/generate", json=payload).status_code
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    statuses = list(pool.map(flask_job, range(jobs)))
+                elapsed = time.perf_counter() - t0
+            report("flask", elapsed, statuses)
+
+            store = ArtifactStore(root=os.path.join(tmp, "asgi"))
+            asgi._store = store
+            asgi._pipeline = AsyncAutoPipeline(store=store)
+            asgi._pipeline._llm = client()
+
+            async def asgi_jobs():
+                return await asyncio.gather(
+                    *(_asgi_call(asgi.app, "POST", "/generate", payload) for _ in range(jobs))
+                )
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                results = asyncio.run(asgi_jobs())
+                elapsed = time.perf_counter() - t0
+            report("asgi", elapsed, [status for status, _ in results])
+    finally:
+        server.shutdown()
+        shutil.rmtree(stub_dir, ignore_errors=True)
+
+
+BENCHMARKS = {
+    "labels": bench_labels,
+    "xml": bench_xml,
+    "startup": bench_startup,
+    "simulator": bench_simulator,
+    "load": bench_load,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"\n=== {name} ===")
+        BENCHMARKS[name]()
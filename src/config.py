@@ -14,6 +14,29 @@ GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 # Groq model
 GROQ_MODEL = "llama-3.3-70b-versatile"
 
+# Optional cheaper/faster Groq model preferred for repair calls
+# (e.g. "llama-3.1-8b-instant"). Unset = repairs use GROQ_MODEL too.
+GROQ_REPAIR_MODEL = os.environ.get("GROQ_REPAIR_MODEL")
+
+# Optional OpenAI-compatible endpoint (OpenAI, vLLM, LM Studio, ...)
+OPENAI_COMPAT_BASE_URL = os.environ.get("OPENAI_COMPAT_BASE_URL")   # e.g. http://localhost:8000/v1
+OPENAI_COMPAT_API_KEY = os.environ.get("OPENAI_COMPAT_API_KEY")
+OPENAI_COMPAT_MODEL = os.environ.get("OPENAI_COMPAT_MODEL", "gpt-4o-mini")
+OPENAI_COMPAT_TIER = os.environ.get("OPENAI_COMPAT_TIER", "fast")    # "strong" or "fast"
+
+# Optional local llama.cpp / Ollama-style server
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL")                 # e.g. http://localhost:11434
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.1")
+
+# Per-request timeout (seconds)
+LLM_TIMEOUT = 120
+
+# Router: rolling window size, max error rate before a backend is
+# deprioritised, and how long a failing / rate-limited backend is parked
+ROUTER_WINDOW = 20
+ROUTER_MAX_ERROR_RATE = 0.5
+ROUTER_COOLDOWN = 30
+
 # -----------------------
 # VERIFYTA CONFIGURATION
 # -----------------------
@@ -21,9 +44,82 @@ GROQ_MODEL = "llama-3.3-70b-versatile"
 # ABSOLUTE PATH TO verifyta.exe  (check this matches your install)
 VERIFYTA_PATH = r"C:\Program Files\UPPAAL-5.0.0\app\bin\verifyta.exe"
 
+# In-process explorer for clock-free models: a property it finds violated
+# sends the attempt to repair without a verifyta run; satisfied results
+# are always confirmed by verifyta (see simulator.py)
+SIMULATOR_PRECHECK = True
+SIMULATOR_MAX_STATES = 200_000
+
+# Diagnostic trace option passed to verifyta (-t0 some, -t1 shortest,
+# -t2 fastest; None disables). Only a bounded summary of each
+# counterexample is kept: the first / last steps of the path.
+VERIFYTA_TRACE = "-t0"
+TRACE_HEAD_STEPS = 3
+TRACE_TAIL_STEPS = 8
+
+# Verification profile used when a request does not name one: a key of
+# profiles.PROFILES, or "auto" to pick the profile that has been fastest
+# on similar models (model size, template count, query kind).
+VERIFYTA_PROFILE = os.environ.get("AUTO_UPPAAL_VERIFY_PROFILE", "auto")
+
+# When a profile hits its timeout, up to this many other profiles are tried
+VERIFYTA_MAX_ESCALATIONS = 2
+
+# "auto" profile: share of runs that try first a profile with fewer than
+# VERIFYTA_EXPLORE_SAMPLES recorded runs on similar models, so a profile
+# that was never tried (or only slow once) still gets measured
+VERIFYTA_EXPLORE_RATE = 0.1
+VERIFYTA_EXPLORE_SAMPLES = 3
+
+# Max concurrent verifyta processes per worker in the asyncio pipeline
+ASYNC_VERIFYTA_CONCURRENCY = os.cpu_count() or 4
+
+# -----------------------
+# REPAIR
+# -----------------------
+
+# Targeted repair: when verifyta errors point at specific templates /
+# the declaration, only those fragments are sent back to the LLM.
+PARTIAL_REPAIR = True
+PARTIAL_REPAIR_MAX_FRAGMENTS = 2
+
+# -----------------------
+# PROFILING
+# -----------------------
+
+# Set AUTO_UPPAAL_PROFILE=1 to print per-attempt time and peak memory
+# (tracemalloc adds overhead, so it is off by default).
+PROFILE_ATTEMPTS = os.environ.get("AUTO_UPPAAL_PROFILE") == "1"
+
 # -----------------------
 # OUTPUT DIRECTORY
 # -----------------------
 
 RESULT_DIR = os.path.join(os.getcwd(), "results")
-os.makedirs(RESULT_DIR, exist_ok=True)
+
+
+def ensure_result_dir() -> str:
+    """
+    Create RESULT_DIR on first use (importing config has no side effects).
+    """
+    os.makedirs(RESULT_DIR, exist_ok=True)
+    return RESULT_DIR
+
+# -----------------------
+# ARTIFACT STORE
+# -----------------------
+
+# SQLite index + compressed, content-addressed blobs for every attempt
+ARTIFACT_DIR = os.path.join(RESULT_DIR, "artifacts")
+
+# Retention: keep at most this many runs, none older than this many days
+ARTIFACT_RETENTION_RUNS = 500
+ARTIFACT_RETENTION_DAYS = 30
+
+# Per-profile verifyta runtimes, used by the "auto" profile selector
+PROFILE_STATS_DB = os.path.join(RESULT_DIR, "verifyta_profiles.sqlite")
+
+# Retention: keep at most this many profile runs, none older than this many
+# days (old timings stop describing the current models / verifyta version)
+PROFILE_STATS_RETENTION_RUNS = 20_000
+PROFILE_STATS_RETENTION_DAYS = 90
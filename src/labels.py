@@ -0,0 +1,232 @@
+# labels.py
+
+"""
+Label normalisation engine.
+
+All patterns are compiled once at import time, character filtering goes
+through str.translate tables instead of re.sub, and normalised texts are
+memoised (LLM models repeat the same 'req!' / 'x = 0' labels many times).
+
+Public API:
+- fix_identifier(name)            -> valid UPPAAL identifier
+- normalize_guard_text(text)      -> str | None
+- normalize_assignment_text(text) -> str | None
+- normalize_sync_text(text)       -> str | None
+- normalize_labels(labels)        -> batch over <label> elements
+- normalize_model_labels(root)    -> batch over every transition label of a model
+"""
+
+import re
+import string
+from functools import lru_cache
+
+
+# ============================================================
+#                   TRANSLATE TABLES
+# ============================================================
+
+class _FilterTable(dict):
+    """
+    str.translate table that keeps `allowed` characters and maps every
+    other code point to `repl` (None = delete). Entries are filled lazily,
+    so arbitrary unicode input costs one lookup per distinct character.
+    """
+
+    def __init__(self, allowed: str, repl=None):
+        super().__init__()
+        self._allowed = frozenset(map(ord, allowed))
+        self._repl = repl
+
+    def __missing__(self, cp):
+        value = cp if cp in self._allowed else self._repl
+        self[cp] = value
+        return value
+
+
+_IDENT_CHARS = string.ascii_letters + string.digits + "_"
+_IDENT_START = frozenset(string.ascii_letters + "_")
+
+_IDENT_TABLE = _FilterTable(_IDENT_CHARS, repl="_")
+_GUARD_TABLE = _FilterTable(_IDENT_CHARS + "<>=+*/!&| \t-")
+_SYNC_TABLE = _FilterTable(_IDENT_CHARS + "!?")
+
+
+# ============================================================
+#                   PRECOMPILED PATTERNS
+# ============================================================
+
+# One update inside an assignment label:
+#   x = 0        x := 0        a[i] = y + 1
+#   n += 2       i++           buf[i][j] -= 1
+# The rhs is plain arithmetic over identifiers, integers and calls; ','
+# only appears there inside brackets (see _split_updates).
+_UPDATE_RE = re.compile(
+    r"""
+    ^\s*
+    (?P<lhs>[A-Za-z_][A-Za-z0-9_]*(?:\s*\[[A-Za-z0-9_+\-*/%() \t]+\])*)
+    \s*
+    (?:
+        (?P<op>:=|[+\-*/]?=)\s*(?P<rhs>[A-Za-z0-9_+\-*/%(),\[\] \t]+?)
+      | (?P<step>\+\+|--)
+    )
+    \s*$
+    """,
+    re.VERBOSE,
+)
+
+_WS_RE = re.compile(r"\s+")
+
+
+# ============================================================
+#                   SINGLE-TEXT NORMALISERS
+# ============================================================
+
+def fix_identifier(name: str) -> str:
+    """
+    Make name a valid UPPAAL identifier.
+    """
+    if not name:
+        return "X"
+
+    name = name.translate(_IDENT_TABLE)
+
+    if name[0] not in _IDENT_START:
+        name = "X" + name
+
+    return name
+
+
+@lru_cache(maxsize=4096)
+def normalize_guard_text(text: str):
+    if not text:
+        return None
+    text = text.strip().translate(_GUARD_TABLE)
+    return text if text.strip() else None
+
+
+@lru_cache(maxsize=4096)
+def normalize_sync_text(text: str):
+    text = (text or "").strip().translate(_SYNC_TABLE)
+    if "!" not in text and "?" not in text:
+        text += "!"
+    return text
+
+
+def _split_updates(text: str):
+    """
+    Split an assignment label on top-level separators (',' is UPPAAL's,
+    ';' is a common LLM slip); separators inside () / [] belong to the
+    update. Returns None if the brackets do not balance.
+    """
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch in "([":
+            depth += 1
+        elif ch in ")]":
+            depth -= 1
+            if depth < 0:
+                return None
+        elif ch in ",;" and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    if depth:
+        return None
+    parts.append(text[start:])
+    return parts
+
+
+@lru_cache(maxsize=4096)
+def normalize_assignment_text(text: str):
+    """
+    Normaliser for assignment labels.
+
+    Accepts comma-separated updates of the form 'lhs op expr' where lhs may
+    carry array indexes, op is one of = := += -= *= /=, plus 'x++' / 'x--'.
+    Clock resets are plain 'c = 0' updates. ':=' is rewritten to '='.
+
+    If any update cannot be parsed safely (boolean operators, member
+    access, fractions, ...) None is returned and the whole label should be
+    removed: rewriting or dropping single updates would silently change
+    what the edge does.
+    """
+    if not text or not text.strip():
+        return None
+
+    parts = _split_updates(text)
+    if parts is None:
+        return None
+
+    updates = []
+    for part in parts:
+        if not part.strip():
+            continue
+
+        m = _UPDATE_RE.match(part)
+        if not m:
+            return None
+
+        lhs = _WS_RE.sub("", m.group("lhs"))
+        if m.group("step"):
+            updates.append(f"{lhs}{m.group('step')}")
+            continue
+
+        op = "=" if m.group("op") == ":=" else m.group("op")
+        rhs = _WS_RE.sub(" ", m.group("rhs").strip())
+        if rhs.count("(") != rhs.count(")") or rhs.count("[") != rhs.count("]"):
+            return None
+        updates.append(f"{lhs} {op} {rhs}")
+
+    if not updates:
+        return None
+
+    return ", ".join(updates)
+
+
+_NORMALIZERS = {
+    "guard": normalize_guard_text,
+    "assignment": normalize_assignment_text,
+    "synchronisation": normalize_sync_text,
+}
+
+
+# ============================================================
+#                        BATCH API
+# ============================================================
+
+def normalize_labels(labels):
+    """
+    Normalise a batch of <label> elements in place.
+    Returns the labels that ended up empty (callers remove them).
+    """
+    empty = []
+    for label in labels:
+        fn = _NORMALIZERS.get(label.get("kind"))
+        if fn is not None:
+            label.text = fn(label.text or "")
+
+        if not label.text or not label.text.strip():
+            empty.append(label)
+
+    return empty
+
+
+def normalize_model_labels(root):
+    """
+    Normalise every transition label of every template in one pass and
+    drop the labels that became empty.
+    """
+    owners = []
+    labels = []
+    for tmpl in root.findall("template"):
+        for trans in tmpl.findall("transition"):
+            for label in trans.findall("label"):
+                owners.append(trans)
+                labels.append(label)
+
+    empty = set(map(id, normalize_labels(labels)))
+    if not empty:
+        return
+
+    for trans, label in zip(owners, labels):
+        if id(label) in empty:
+            trans.remove(label)
@@ -1,22 +1,260 @@
 # llm_client.py
 
-from groq import Groq
-from config import GROQ_MODEL, GROQ_API_KEY
+import threading
+import time
+from collections import deque
 
+from config import (
+    GROQ_MODEL,
+    GROQ_API_KEY,
+    GROQ_REPAIR_MODEL,
+    OPENAI_COMPAT_BASE_URL,
+    OPENAI_COMPAT_API_KEY,
+    OPENAI_COMPAT_MODEL,
+    OPENAI_COMPAT_TIER,
+    OLLAMA_BASE_URL,
+    OLLAMA_MODEL,
+    LLM_TIMEOUT,
+    ROUTER_WINDOW,
+    ROUTER_MAX_ERROR_RATE,
+    ROUTER_COOLDOWN,
+)
+from llm_providers import (
+    ProviderError,
+    GroqProvider,
+    OpenAICompatProvider,
+    OllamaProvider,
+)
+
+
+# Tier preference per call purpose: first generation goes to the strongest
+# model, repairs to whatever is fastest (cheap models first).
+_TIER_RANK = {
+    "generate": {"strong": 0, "fast": 1},
+    "repair": {"fast": 0, "strong": 1},
+    "repair_partial": {"fast": 0, "strong": 1},
+}
+
+
+def default_providers():
+    """
+    Backends enabled by config.py / environment variables.
+    """
+    providers = []
+
+    if GROQ_API_KEY:
+        providers.append(GroqProvider(GROQ_API_KEY, GROQ_MODEL, tier="strong", timeout=LLM_TIMEOUT))
+        if GROQ_REPAIR_MODEL and GROQ_REPAIR_MODEL != GROQ_MODEL:
+            providers.append(GroqProvider(GROQ_API_KEY, GROQ_REPAIR_MODEL, tier="fast", timeout=LLM_TIMEOUT))
+
+    if OPENAI_COMPAT_BASE_URL:
+        providers.append(OpenAICompatProvider(
+            OPENAI_COMPAT_BASE_URL, OPENAI_COMPAT_MODEL, OPENAI_COMPAT_API_KEY,
+            tier=OPENAI_COMPAT_TIER, timeout=LLM_TIMEOUT,
+        ))
+
+    if OLLAMA_BASE_URL:
+        providers.append(OllamaProvider(OLLAMA_BASE_URL, OLLAMA_MODEL, tier="fast", timeout=LLM_TIMEOUT))
+
+    return providers
+
+
+# ============================================================
+#                     BACKEND HEALTH
+# ============================================================
+
+class BackendStats:
+    """
+    Rolling latency / error window and last known quota of one backend.
+    """
+
+    def __init__(self, window: int = ROUTER_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)   # True = success
+        self.quota = None                      # remaining requests, if reported
+        self.cooldown_until = 0.0
+        self.completion_tokens = 0
+
+    @property
+    def mean_latency(self):
+        if not self.latencies:
+            return 0.0   # untried backends get a chance first
+        return sum(self.latencies) / len(self.latencies)
+
+    @property
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def healthy(self, now: float) -> bool:
+        if now < self.cooldown_until:
+            return False
+        return self.error_rate <= ROUTER_MAX_ERROR_RATE
+
+
+class LLMRouter:
+    """
+    Sends each call to the fastest healthy backend for its purpose and
+    falls back to the next one on failure.
+    """
+
+    def __init__(self, providers):
+        if not providers:
+            raise RuntimeError(
+                "No LLM backend configured: set GROQ_API_KEY, "
+                "OPENAI_COMPAT_BASE_URL or OLLAMA_BASE_URL"
+            )
+        self.providers = list(providers)
+        self.stats = {p.name: BackendStats() for p in self.providers}
+        self._lock = threading.Lock()
+
+    def _candidates(self, purpose: str):
+        rank = _TIER_RANK.get(purpose, _TIER_RANK["generate"])
+        now = time.monotonic()
+
+        with self._lock:
+            scored = [
+                (now < self.stats[p.name].cooldown_until,
+                 self.stats[p.name].error_rate > ROUTER_MAX_ERROR_RATE,
+                 rank.get(p.tier, len(rank)),
+                 self.stats[p.name].mean_latency,
+                 i, p)
+                for i, p in enumerate(self.providers)
+            ]
+
+        # Parked / error-prone backends stay at the end as a last resort;
+        # once their cooldown expires they get traffic again and recover
+        return [p for *_, p in sorted(scored)]
+
+    def _success(self, provider, elapsed: float, tokens, quota):
+        with self._lock:
+            st = self.stats[provider.name]
+            st.latencies.append(elapsed)
+            st.outcomes.append(True)
+            if quota is not None:
+                st.quota = quota
+                if quota == 0:
+                    st.cooldown_until = time.monotonic() + ROUTER_COOLDOWN
+            if tokens:
+                st.completion_tokens += tokens
+
+    def _failure(self, provider, err: Exception):
+        with self._lock:
+            st = self.stats[provider.name]
+            st.outcomes.append(False)
+            if getattr(err, "status", None) == 429:
+                # Out of quota: park the backend until it resets
+                st.quota = 0
+                st.cooldown_until = time.monotonic() + (err.retry_after or ROUTER_COOLDOWN)
+            else:
+                st.cooldown_until = time.monotonic() + ROUTER_COOLDOWN
+
+    def complete(self, prompt: str, purpose: str = "generate"):
+        """
+        Returns (text, completion_tokens, provider_name).
+        """
+        errors = []
+        for provider in self._candidates(purpose):
+            t0 = time.perf_counter()
+            try:
+                text, tokens, quota = provider.complete(prompt)
+            except ProviderError as e:
+                self._report_failure(provider, purpose, e, errors)
+                continue
+            return self._report_success(provider, purpose, t0, text, tokens, quota)
+
+        raise RuntimeError("All LLM backends failed:\n" + "\n".join(errors))
+
+    async def acomplete(self, prompt: str, purpose: str = "generate"):
+        """
+        asyncio counterpart of complete(); same routing and health tracking.
+        """
+        errors = []
+        for provider in self._candidates(purpose):
+            t0 = time.perf_counter()
+            try:
+                text, tokens, quota = await provider.acomplete(prompt)
+            except ProviderError as e:
+                self._report_failure(provider, purpose, e, errors)
+                continue
+            return self._report_success(provider, purpose, t0, text, tokens, quota)
+
+        raise RuntimeError("All LLM backends failed:\n" + "\n".join(errors))
+
+    def _report_failure(self, provider, purpose, err, errors):
+        self._failure(provider, err)
+        errors.append(f"{provider.name}: {err}")
+        print(f"[LLM] {provider.name} failed ({purpose}): {err}")
+
+    def _report_success(self, provider, purpose, t0, text, tokens, quota):
+        elapsed = time.perf_counter() - t0
+        self._success(provider, elapsed, tokens, quota)
+        print(f"[LLM] {purpose} via {provider.name} in {elapsed:.1f}s")
+        return text, tokens, provider.name
+
+    def snapshot(self):
+        """
+        Per-backend health, for diagnostics.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "name": p.name,
+                    "tier": p.tier,
+                    "healthy": self.stats[p.name].healthy(now),
+                    "mean_latency": round(self.stats[p.name].mean_latency, 3),
+                    "error_rate": round(self.stats[p.name].error_rate, 3),
+                    "quota": self.stats[p.name].quota,
+                    "completion_tokens": self.stats[p.name].completion_tokens,
+                }
+                for p in self.providers
+            ]
+
+
+# ============================================================
+#                     CLIENT
+# ============================================================
 
 class LLMClient:
-    def __init__(self):
-        if not GROQ_API_KEY:
-            raise RuntimeError("Set GROQ_API_KEY environment variable")
-        self.client = Groq(api_key=GROQ_API_KEY)
-        self.model = GROQ_MODEL
-
-    def ask(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature = 0
-        )
-
-        msg = response.choices[0].message.content
+    def __init__(self, providers=None):
+        if providers is None:
+            providers = default_providers()
+        self.router = LLMRouter(providers)
+        # Calls and output tokens per purpose (generate / repair / repair_partial)
+        self.usage = {}
+        self._usage_lock = threading.Lock()
+
+    def warm(self):
+        """
+        Open connections (and validate credentials) of every backend ahead
+        of the first real request. Fails only if no backend is reachable.
+        """
+        errors = []
+        for provider in self.router.providers:
+            try:
+                provider.warm()
+            except Exception as e:
+                errors.append(f"{provider.name}: {e}")
+        if len(errors) == len(self.router.providers):
+            raise RuntimeError("; ".join(errors))
+
+    def ask(self, prompt: str, purpose: str = "generate") -> str:
+        msg, tokens, _ = self.router.complete(prompt, purpose)
+        return self._account(purpose, msg, tokens)
+
+    async def ask_async(self, prompt: str, purpose: str = "generate") -> str:
+        msg, tokens, _ = await self.router.acomplete(prompt, purpose)
+        return self._account(purpose, msg, tokens)
+
+    def _account(self, purpose: str, msg: str, tokens) -> str:
+        with self._usage_lock:
+            u = self.usage.setdefault(purpose, {"calls": 0, "completion_tokens": 0})
+            u["calls"] += 1
+            u["completion_tokens"] += tokens or 0
+
+        if tokens is not None:
+            print(f"[TOKENS] {purpose}: {tokens} output tokens")
+
         return msg.strip()
@@ -0,0 +1,329 @@
+# llm_providers.py
+
+"""
+LLM backends used by LLMClient.
+
+Every provider exposes the same small interface:
+- complete(prompt)        -> (text, completion_tokens, quota_remaining)
+- await acomplete(prompt) -> same, without blocking the event loop
+- warm()                  -> open connections / validate credentials
+
+Supported:
+- GroqProvider          (Groq SDK)
+- OpenAICompatProvider  (any /v1/chat/completions endpoint)
+- OllamaProvider        (Ollama / llama.cpp-style /api/chat server)
+
+The HTTP providers only use the standard library, so they can be pointed
+at local stub servers in tests.
+"""
+
+import asyncio
+import http.client
+import json
+import ssl
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+from email.parser import BytesHeaderParser
+
+
+class ProviderError(RuntimeError):
+    """
+    A backend call failed. `status` is the HTTP status when known;
+    `retry_after` (seconds) is set for rate-limit responses.
+    """
+
+    def __init__(self, message: str, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _int_header(headers, name):
+    value = headers.get(name) if headers is not None else None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+# ============================================================
+#                     HTTP HELPERS
+# ============================================================
+
+def _request_json(url: str, payload=None, headers=None, timeout: float = 120):
+    """
+    GET (payload None) or POST JSON; returns (body_dict, response_headers).
+    Every failure (transport, HTTP status, bad JSON) is a ProviderError,
+    so the router can fail over.
+    """
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(url, data=data, method="GET" if data is None else "POST")
+    req.add_header("Content-Type", "application/json")
+    for k, v in (headers or {}).items():
+        req.add_header(k, v)
+
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8") or "{}"), resp.headers
+    except urllib.error.HTTPError as e:
+        detail = e.read().decode("utf-8", errors="replace")[:500]
+        raise ProviderError(
+            f"HTTP {e.code} from {url}: {detail}",
+            status=e.code,
+            retry_after=_int_header(e.headers, "retry-after"),
+        ) from e
+    except (urllib.error.URLError, http.client.HTTPException, TimeoutError, OSError) as e:
+        raise ProviderError(f"{url}: {e}") from e
+    except ValueError as e:
+        raise ProviderError(f"{url}: invalid JSON") from e
+
+
+async def _request_json_async(url: str, payload=None, headers=None, timeout: float = 120):
+    """
+    asyncio counterpart of _request_json built on asyncio streams
+    (HTTP/1.0, so the body is simply read to EOF; no extra dependency).
+    Redirects and chunked bodies are not followed / decoded: they are
+    reported as ProviderError like any other unusable response.
+    """
+    parts = urllib.parse.urlsplit(url)
+    https = parts.scheme == "https"
+    port = parts.port or (443 if https else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+
+    data = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    lines = [
+        f"{'GET' if payload is None else 'POST'} {path} HTTP/1.0",
+        # host[:port] as written in the URL (non-default ports must be sent)
+        f"Host: {parts.netloc.rpartition('@')[2]}",
+        "Accept: application/json",
+        "Content-Type: application/json",
+        f"Content-Length: {len(data)}",
+    ]
+    lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+    request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data
+
+    async def exchange():
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port,
+            ssl=ssl.create_default_context() if https else None,
+        )
+        try:
+            writer.write(request)
+            await writer.drain()
+            return await reader.read()
+        finally:
+            writer.close()
+
+    try:
+        response = await asyncio.wait_for(exchange(), timeout)
+    except (OSError, asyncio.TimeoutError) as e:
+        raise ProviderError(f"{url}: {e!r}") from e
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    status_line, _, header_block = head.partition(b"\r\n")
+    try:
+        status = int(status_line.split()[1])
+    except (IndexError, ValueError) as e:
+        raise ProviderError(f"{url}: malformed response") from e
+    resp_headers = BytesHeaderParser().parsebytes(header_block)
+
+    if status >= 400:
+        raise ProviderError(
+            f"HTTP {status} from {url}: {body.decode('utf-8', errors='replace')[:500]}",
+            status=status,
+            retry_after=_int_header(resp_headers, "retry-after"),
+        )
+    if status >= 300:
+        raise ProviderError(
+            f"HTTP {status} from {url}: redirect to {resp_headers.get('location')} not followed",
+            status=status,
+        )
+    if "chunked" in (resp_headers.get("transfer-encoding") or "").lower():
+        raise ProviderError(f"{url}: chunked response not supported", status=status)
+
+    try:
+        return json.loads(body.decode("utf-8") or "{}"), resp_headers
+    except ValueError as e:
+        raise ProviderError(f"{url}: invalid JSON") from e
+
+
+# ============================================================
+#                     PROVIDERS
+# ============================================================
+
+class Provider:
+    """
+    Base class. `tier` is 'strong' (best model, used first for initial
+    generation) or 'fast' (cheaper/faster, preferred for repairs).
+    """
+
+    kind = "base"
+
+    def __init__(self, model: str, tier: str = "strong", name: str = None):
+        self.model = model
+        self.tier = tier
+        self.name = name or f"{self.kind}:{model}"
+
+    def complete(self, prompt: str):
+        raise NotImplementedError
+
+    async def acomplete(self, prompt: str):
+        raise NotImplementedError
+
+    def warm(self):
+        pass
+
+
+@contextmanager
+def _groq_errors():
+    import groq
+
+    try:
+        yield
+    except groq.APIStatusError as e:
+        raise ProviderError(
+            str(e),
+            status=e.status_code,
+            retry_after=_int_header(e.response.headers, "retry-after"),
+        ) from e
+    except groq.APIError as e:
+        raise ProviderError(str(e)) from e
+
+
+class GroqProvider(Provider):
+
+    kind = "groq"
+
+    def __init__(self, api_key: str, model: str, tier: str = "strong", timeout: float = 120):
+        super().__init__(model, tier)
+        # Imported here: the Groq SDK (httpx, pydantic, ...) is the slowest
+        # import of the backend and is not needed until the first call.
+        from groq import Groq
+        self.client = Groq(api_key=api_key, timeout=timeout)
+        self._api_key = api_key
+        self._timeout = timeout
+        self._async_client = None
+
+    def warm(self):
+        self.client.models.list()
+
+    def _request(self, prompt: str):
+        return dict(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+        )
+
+    def complete(self, prompt: str):
+        with _groq_errors():
+            raw = self.client.chat.completions.with_raw_response.create(**self._request(prompt))
+        return self._unpack(raw)
+
+    async def acomplete(self, prompt: str):
+        if self._async_client is None:
+            from groq import AsyncGroq
+            self._async_client = AsyncGroq(api_key=self._api_key, timeout=self._timeout)
+
+        with _groq_errors():
+            raw = await self._async_client.chat.completions.with_raw_response.create(**self._request(prompt))
+        return self._unpack(raw)
+
+    def _unpack(self, raw):
+        try:
+            response = raw.parse()
+            text = response.choices[0].message.content or ""
+        except (IndexError, AttributeError, TypeError, ValueError) as e:
+            raise ProviderError(f"Malformed response from {self.name}: {e}") from e
+
+        usage = getattr(response, "usage", None)
+        tokens = getattr(usage, "completion_tokens", None)
+        quota = _int_header(raw.headers, "x-ratelimit-remaining-requests")
+        return text, tokens, quota
+
+
+class OpenAICompatProvider(Provider):
+
+    kind = "openai"
+
+    def __init__(self, base_url: str, model: str, api_key: str = None,
+                 tier: str = "strong", timeout: float = 120):
+        super().__init__(model, tier)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+    def warm(self):
+        _request_json(f"{self.base_url}/models", headers=self.headers, timeout=self.timeout)
+
+    def _payload(self, prompt: str):
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0,
+        }
+
+    def complete(self, prompt: str):
+        body, headers = _request_json(
+            f"{self.base_url}/chat/completions", self._payload(prompt),
+            headers=self.headers, timeout=self.timeout,
+        )
+        return self._unpack(body, headers)
+
+    async def acomplete(self, prompt: str):
+        body, headers = await _request_json_async(
+            f"{self.base_url}/chat/completions", self._payload(prompt),
+            headers=self.headers, timeout=self.timeout,
+        )
+        return self._unpack(body, headers)
+
+    def _unpack(self, body, headers):
+        try:
+            text = body["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError) as e:
+            raise ProviderError(f"Malformed response from {self.base_url}: {body!r:.200}") from e
+
+        tokens = (body.get("usage") or {}).get("completion_tokens")
+        quota = _int_header(headers, "x-ratelimit-remaining-requests")
+        return text, tokens, quota
+
+
+class OllamaProvider(Provider):
+
+    kind = "ollama"
+
+    def __init__(self, base_url: str, model: str, tier: str = "fast", timeout: float = 300):
+        super().__init__(model, tier)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def warm(self):
+        _request_json(f"{self.base_url}/api/tags", timeout=self.timeout)
+
+    def _payload(self, prompt: str):
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": False,
+            "options": {"temperature": 0},
+        }
+
+    def complete(self, prompt: str):
+        body, _ = _request_json(f"{self.base_url}/api/chat", self._payload(prompt), timeout=self.timeout)
+        return self._unpack(body)
+
+    async def acomplete(self, prompt: str):
+        body, _ = await _request_json_async(f"{self.base_url}/api/chat", self._payload(prompt), timeout=self.timeout)
+        return self._unpack(body)
+
+    def _unpack(self, body):
+        try:
+            text = body["message"]["content"] or ""
+        except (KeyError, TypeError) as e:
+            raise ProviderError(f"Malformed response from {self.base_url}: {body!r:.200}") from e
+
+        # Local servers have no quota
+        return text, body.get("eval_count"), None
@@ -1,11 +1,21 @@
 # main.py
 
+import argparse
 import os
+from artifacts import ArtifactStore
 from pipeline import AutoPipeline
-from config import RESULT_DIR
+from profiles import profile_names
+from config import ensure_result_dir
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Auto-UPPAAL (Groq + verifyta)")
+    parser.add_argument(
+        "--profile", choices=profile_names(), default=None,
+        help="verification profile (default: VERIFYTA_PROFILE in config.py)",
+    )
+    args = parser.parse_args()
+
     print("Auto-UPPAAL (Groq + verifyta)")
 
     print("Describe your model:")
@@ -25,8 +35,14 @@ def main():
             break
         queries.append(line.strip())
 
-    pipe = AutoPipeline()
-    ok, attempts, msg, xml = pipe.run(description, queries)
+    store = ArtifactStore()
+    run_id = store.start_run(description, queries)
+
+    pipe = AutoPipeline(store=store)
+    ok, attempts, msg, xml = pipe.run(description, queries, run_id=run_id, profile=args.profile)
+
+    store.finish_run(run_id, ok, attempts, xml)
+    store.apply_retention()
 
     # Decide output filename
     if ok:
@@ -34,7 +50,7 @@ def main():
     else:
         out_name = "output_failed.xml"
 
-    out_path = os.path.join(RESULT_DIR, out_name)
+    out_path = os.path.join(ensure_result_dir(), out_name)
 
     with open(out_path, "w", encoding="utf-8") as f:
         f.write(xml)
@@ -44,6 +60,7 @@ def main():
     print("Attempts:", attempts)
     print("Verifier message:\n", msg)
     print("\nSaved at:", out_path)
+    print("Run ID:", run_id, f"(artifacts in {store.root})")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,185 @@
+# partial_repair.py
+
+"""
+Targeted (partial-model) repair.
+
+verifyta reports syntax / type errors with an XPath-like location, e.g.
+
+    /nta/template[2]/transition[1]/label[3]:1: syntax error ...
+    /nta/declaration:3: ...
+
+We map those to the affected top-level <template> / <declaration>
+elements, send only those fragments (plus a compact summary of the rest
+of the model) to the LLM, and splice the replacements back in. Output
+tokens then scale with the broken fragment, not with the whole model.
+"""
+
+import re
+import xml.etree.ElementTree as ET
+
+from config import PARTIAL_REPAIR_MAX_FRAGMENTS
+
+
+_PATH_RE = re.compile(r"/nta/(template\[(\d+)\]|declaration|system)")
+
+_SYNC_KIND = "synchronisation"
+
+# Max characters of the global declaration quoted in the summary
+_DECL_SUMMARY_CHARS = 2000
+
+
+# ============================================================
+#                DIAGNOSTICS → FRAGMENTS
+# ============================================================
+
+def locate_failing_fragments(xml_text, verifier_msg: str):
+    """
+    Returns the failing fragments as a list of ("declaration", None) /
+    ("template", index) tuples in document order, or None when a targeted
+    repair is not possible (no located errors, <system> errors, too many
+    fragments, unparsable model).
+    """
+    matches = _PATH_RE.findall(verifier_msg or "")
+    if not matches:
+        return None
+
+    if any(m[0] == "system" for m in matches):
+        # <system> is rebuilt by validate_and_repair_xml anyway
+        return None
+
+    try:
+        root = ET.fromstring(xml_text)
+    except ET.ParseError:
+        return None
+    n_templates = len(root.findall("template"))
+
+    # XPath indices are 1-based; tolerate tools that report 0-based ones
+    indices = [int(m[1]) for m in matches if m[1]]
+    base = 0 if 0 in indices else 1
+
+    targets = set()
+    for m in matches:
+        if m[0] == "declaration":
+            targets.add(("declaration", None))
+            continue
+        idx = int(m[1]) - base
+        if not 0 <= idx < n_templates:
+            return None
+        targets.add(("template", idx))
+
+    if len(targets) > PARTIAL_REPAIR_MAX_FRAGMENTS:
+        return None
+
+    return sorted(targets, key=lambda t: (t[0] != "declaration", t[1] or 0))
+
+
+# ============================================================
+#                   FRAGMENTS + SUMMARY
+# ============================================================
+
+def _get_fragment(root: ET.Element, target):
+    kind, idx = target
+    if kind == "declaration":
+        return root.find("declaration")
+    return root.findall("template")[idx]
+
+
+def _template_summary(tmpl: ET.Element) -> str:
+    name = tmpl.find("name")
+    name = name.text.strip() if name is not None and name.text else "?"
+
+    locs = []
+    for loc in tmpl.findall("location"):
+        nm = loc.find("name")
+        locs.append(nm.text.strip() if nm is not None and nm.text else loc.get("id", "?"))
+
+    syncs = sorted({
+        (label.text or "").strip()
+        for label in tmpl.iter("label")
+        if label.get("kind") == _SYNC_KIND and label.text
+    })
+
+    line = f"- template {name}: locations [{', '.join(locs)}], {len(tmpl.findall('transition'))} transitions"
+    if syncs:
+        line += f", syncs [{', '.join(syncs)}]"
+    return line
+
+
+def extract_fragments(xml_text, targets):
+    """
+    Returns (fragments_xml, summary) for build_partial_repair_prompt.
+    """
+    root = ET.fromstring(xml_text)
+
+    fragments = []
+    for target in targets:
+        elem = _get_fragment(root, target)
+        if elem is None:
+            # Missing <declaration>: ask for a fresh one
+            fragments.append("<declaration></declaration>")
+        else:
+            elem.tail = None
+            fragments.append(ET.tostring(elem, encoding="unicode"))
+
+    summary = []
+    if ("declaration", None) not in targets:
+        decl = root.find("declaration")
+        text = (decl.text or "").strip() if decl is not None else ""
+        if len(text) > _DECL_SUMMARY_CHARS:
+            text = text[:_DECL_SUMMARY_CHARS] + " ..."
+        summary.append(f"Global declarations:\n{text or '(none)'}")
+
+    skip = {idx for kind, idx in targets if kind == "template"}
+    others = [
+        _template_summary(t)
+        for i, t in enumerate(root.findall("template"))
+        if i not in skip
+    ]
+    if others:
+        summary.append("Other templates (unchanged):\n" + "\n".join(others))
+
+    return "\n\n".join(fragments), "\n\n".join(summary)
+
+
+# ============================================================
+#                        SPLICING
+# ============================================================
+
+def splice_fragments(xml_text, targets, reply: str):
+    """
+    Replace the targeted fragments with the LLM's replacements.
+    Returns the new model as str, or None if the reply does not contain
+    exactly the expected elements.
+    """
+    if not reply:
+        return None
+
+    reply = reply.replace("```xml", "").replace("```", "").strip()
+    try:
+        wrapper = ET.fromstring(f"<fragments>{reply}</fragments>")
+    except ET.ParseError:
+        return None
+
+    # Accept the replacements with or without our <fragments> wrapper
+    inner = wrapper.find("fragments")
+    if inner is not None:
+        wrapper = inner
+
+    replacements = [e for e in wrapper if e.tag in ("template", "declaration")]
+    if [e.tag for e in replacements] != [kind for kind, _ in targets]:
+        return None
+
+    root = ET.fromstring(xml_text)
+
+    for (kind, idx), new in zip(targets, replacements):
+        old = _get_fragment(root, (kind, idx))
+        if old is None:
+            # declaration was missing: insert it first
+            root.insert(0, new)
+            continue
+        pos = list(root).index(old)
+        new.tail = old.tail
+        root.remove(old)
+        root.insert(pos, new)
+
+    return ET.tostring(root, encoding="unicode")
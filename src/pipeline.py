@@ -1,74 +1,169 @@
 # pipeline.py
 
+import time
+import tracemalloc
+
+from config import PARTIAL_REPAIR, PROFILE_ATTEMPTS
 from llm_client import LLMClient
-from prompts import build_generator_prompt, build_repair_prompt
+from partial_repair import locate_failing_fragments, extract_fragments, splice_fragments
+from prompts import build_generator_prompt, build_repair_prompt, build_partial_repair_prompt
+from traces import diff_properties
 from xml_utils import (
     sanitize_xml,
     force_minimal_model,
-    validate_and_repair_xml,
+    validate_and_repair_xml_bytes,
 )
-from verifyta_runner import run_verifyta
+from verifyta_runner import verify_model
 
 MAX_ATTEMPTS = 10
 
 
+def _wants_forced_model(description) -> bool:
+    d = description.lower()
+    return "minimal" in d and "no transitions" in d
+
+
+def _print_attempt(attempt, raw, props):
+    print(f"\n--- Attempt {attempt}/{MAX_ATTEMPTS} ---")
+    print(raw)
+
+    print("\nPROPERTY RESULTS:")
+    if props:
+        for i, p in enumerate(props, start=1):
+            print(f"Property {i}: {'UNKNOWN' if p is None else 'SAT' if p else 'UNSAT'}")
+        print("\nOVERALL:", "ALL SATISFIED" if all(p is True for p in props) else "NOT SATISFIED")
+    else:
+        print("No properties returned by verifyta.")
+        print("\nOVERALL: UNKNOWN")
+
+
 class AutoPipeline:
 
-    def __init__(self):
-        self.llm = LLMClient()
+    def __init__(self, store=None):
+        self._llm = None
+        # Optional ArtifactStore; when set, every attempt is recorded
+        self.store = store
+
+    @property
+    def llm(self):
+        # Created on first use, so the forced minimal model (and pre-warm
+        # probes) work without touching the LLM SDK.
+        if self._llm is None:
+            self._llm = LLMClient()
+        return self._llm
+
+    def _record(self, run_id, attempt, kind, data):
+        if self.store is not None and run_id is not None:
+            self.store.record(run_id, attempt, kind, data)
 
     # ---------------------------------------------------------
     # MODEL GENERATION
     # ---------------------------------------------------------
-    def generate_xml(self, description, queries):
-        d = description.lower()
-
-        if "minimal" in d and "no transitions" in d:
+    def generate_xml(self, description, queries, run_id=None):
+        if _wants_forced_model(description):
             print("\n[INFO] Using forced Minimal model (bypassing LLM).")
             return force_minimal_model()
 
         prompt = build_generator_prompt(description, queries)
-        xml = self.llm.ask(prompt)
+        xml = self.llm.ask(prompt, purpose="generate")
+        self._record(run_id, 1, "prompt", prompt)
+        self._record(run_id, 1, "llm_output", xml)
         return sanitize_xml(xml)
 
     # ---------------------------------------------------------
     # MODEL REPAIR
     # ---------------------------------------------------------
-    def repair_xml(self, broken_xml, msg, queries):
-        prompt = build_repair_prompt(broken_xml, msg, queries)
-        xml = self.llm.ask(prompt)
+    def repair_xml(self, broken_xml, msg, queries, run_id=None, attempt=None, progress=""):
+        if isinstance(broken_xml, bytes):
+            broken_xml = broken_xml.decode("utf-8")
+
+        if PARTIAL_REPAIR:
+            xml = self.repair_fragments(broken_xml, msg, queries, run_id=run_id, attempt=attempt)
+            if xml is not None:
+                return xml
+
+        prompt = build_repair_prompt(broken_xml, msg, queries, progress)
+        xml = self.llm.ask(prompt, purpose="repair")
+        self._record(run_id, attempt, "prompt", prompt)
+        self._record(run_id, attempt, "llm_output", xml)
         return sanitize_xml(xml)
 
+    def repair_fragments(self, broken_xml, msg, queries, run_id=None, attempt=None):
+        """
+        Targeted repair: only the <template>/<declaration> elements that
+        verifyta's diagnostics point at are regenerated and spliced back.
+        Returns None when the errors cannot be localised or the reply
+        cannot be spliced (caller falls back to a full repair).
+        """
+        targets = locate_failing_fragments(broken_xml, msg)
+        if not targets:
+            return None
+
+        fragments, summary = extract_fragments(broken_xml, targets)
+        prompt = build_partial_repair_prompt(fragments, summary, msg, queries)
+        reply = self.llm.ask(prompt, purpose="repair_partial")
+        self._record(run_id, attempt, "prompt", prompt)
+        self._record(run_id, attempt, "llm_output", reply)
+
+        xml = splice_fragments(broken_xml, targets, reply)
+        if xml is None:
+            print("[INFO] Partial repair reply could not be spliced; falling back to full repair.")
+            return None
+
+        print(f"[INFO] Partial repair of {', '.join(k if i is None else f'{k}[{i}]' for k, i in targets)}.")
+        return xml
+
     # ---------------------------------------------------------
     # MAIN LOOP
     # ---------------------------------------------------------
-    def run(self, description, queries):
-        xml = self.generate_xml(description, queries)
+    def run(self, description, queries, run_id=None, profile=None):
+        """
+        Generate / verify / repair loop.
+        If `run_id` is given (and a store is configured), prompts, raw LLM
+        output, checked XML, verifier logs and parsed properties of every
+        attempt are recorded under that run.
+        `profile` selects the verification profile (see profiles.py).
+        """
+        xml = self.generate_xml(description, queries, run_id=run_id)
+        prev_props = None
 
         for attempt in range(1, MAX_ATTEMPTS + 1):
 
+            if PROFILE_ATTEMPTS:
+                tracemalloc.start()
+            t0 = time.perf_counter()
+
             # VALIDATE & NORMALIZE XML BEFORE verifyta
-            xml_checked = validate_and_repair_xml(xml, queries)
+            # (kept as UTF-8 bytes all the way into the verifyta input file)
+            xml_checked = validate_and_repair_xml_bytes(xml, queries)
+            t1 = time.perf_counter()
+
+            ok, raw, props = verify_model(xml_checked, queries, profile)
+            t2 = time.perf_counter()
 
-            ok, raw, props = run_verifyta(xml_checked, queries)
+            if PROFILE_ATTEMPTS:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(
+                    f"[PERF] attempt {attempt}: {len(xml_checked)} bytes, "
+                    f"repair {(t1 - t0) * 1000:.1f} ms, "
+                    f"verify {(t2 - t1) * 1000:.1f} ms, "
+                    f"peak {peak / 1024:.0f} KiB"
+                )
 
-            print(f"\n--- Attempt {attempt}/{MAX_ATTEMPTS} ---")
-            print(raw)
+            self._record(run_id, attempt, "xml", xml_checked)
+            self._record(run_id, attempt, "verifier_log", raw)
+            self._record(run_id, attempt, "properties", props)
 
-            print("\nPROPERTY RESULTS:")
-            if props:
-                for i, p in enumerate(props, start=1):
-                    print(f"Property {i}: {'SAT' if p else 'UNSAT'}")
-                print("\nOVERALL:", "ALL SATISFIED" if all(props) else "NOT SATISFIED")
-            else:
-                print("No properties returned by verifyta.")
-                print("\nOVERALL: UNKNOWN")
+            _print_attempt(attempt, raw, props)
 
             if ok:
-                return True, attempt, raw, xml_checked
+                return True, attempt, raw, xml_checked.decode("utf-8")
 
             # Otherwise attempt repair
-            xml = self.repair_xml(xml_checked, raw, queries)
+            progress = diff_properties(queries, prev_props, props)
+            prev_props = props
+            xml = self.repair_xml(xml_checked, raw, queries, run_id=run_id, attempt=attempt + 1, progress=progress)
 
-        last = validate_and_repair_xml(xml, queries)
-        return False, MAX_ATTEMPTS, raw, last
+        last = validate_and_repair_xml_bytes(xml, queries)
+        return False, MAX_ATTEMPTS, raw, last.decode("utf-8")
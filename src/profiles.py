@@ -0,0 +1,233 @@
+# profiles.py
+
+"""
+Verification profiles: named verifyta option sets with a timeout each.
+
+Search order and state-space reduction can change verifyta's runtime and
+memory by orders of magnitude depending on the model, so every run is
+timed and stored (PROFILE_STATS_DB) together with coarse model features:
+
+- query kind    (E<>, A[], deadlock, ...)
+- templates     (power-of-two bucket)
+- model size    (power-of-two bucket of KiB)
+
+The "auto" profile tries first whichever profile has been cheapest on
+similar models, except for a share of runs (VERIFYTA_EXPLORE_RATE) that
+try a profile with too few samples there; a run that times out escalates
+to the next profile. Old runs are pruned (PROFILE_STATS_RETENTION_*).
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from config import (
+    PROFILE_STATS_DB,
+    PROFILE_STATS_RETENTION_DAYS,
+    PROFILE_STATS_RETENTION_RUNS,
+    VERIFYTA_EXPLORE_RATE,
+    VERIFYTA_EXPLORE_SAMPLES,
+    VERIFYTA_MAX_ESCALATIONS,
+    ensure_result_dir,
+)
+
+
+# options: extra verifyta arguments (the trace option is added separately)
+# timeout: seconds before the run is killed and the next profile is tried
+PROFILES = {
+    # Breadth-first, no state-space reduction: fastest when it fits in memory
+    "fast-bfs": {"options": ["-o0", "-S0"], "timeout": 60},
+    # Depth-first: reaches violations (and their traces) quickly
+    "dfs-counterexample": {"options": ["-o1"], "timeout": 60},
+    # Aggressive state-space reduction, DFS waiting list: large models
+    "memory-lean": {"options": ["-o1", "-S2"], "timeout": 300},
+    # Random depth-first: cheap probing of huge state spaces
+    "random-dfs": {"options": ["-o2"], "timeout": 60},
+}
+
+AUTO = "auto"
+
+# Try order when nothing has been recorded for a model yet
+_DEFAULT_ORDER = ["fast-bfs", "dfs-counterexample", "memory-lean", "random-dfs"]
+
+# A timed-out run counts this many times its (cut-off) runtime when ranking
+_TIMEOUT_PENALTY = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profile_runs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    created     REAL NOT NULL,
+    kind        TEXT NOT NULL,
+    templates   INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    profile     TEXT NOT NULL,
+    seconds     REAL NOT NULL,
+    timed_out   INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS profile_runs_key ON profile_runs(kind, templates, size);
+CREATE INDEX IF NOT EXISTS profile_runs_created ON profile_runs(created);
+"""
+
+
+def profile_names():
+    return [AUTO] + list(PROFILES)
+
+
+# ============================================================
+#                     MODEL FEATURES
+# ============================================================
+
+def _query_kind(query: str) -> str:
+    q = query.strip()
+    if "deadlock" in q:
+        return "deadlock"
+    if "-->" in q:
+        return "leadsto"
+    for prefix in ("E<>", "E[]", "A[]", "A<>"):
+        if q.startswith(prefix):
+            return prefix
+    return "other"
+
+
+def model_features(xml_text, queries: list[str]):
+    """
+    (kind, templates, size) key of one verifyta call. Cheap on purpose:
+    counts bytes instead of parsing the model.
+    """
+    if isinstance(xml_text, str):
+        xml_text = xml_text.encode("utf-8")
+    kind = "+".join(sorted({_query_kind(q) for q in queries})) or "other"
+    templates = xml_text.count(b"<template").bit_length()
+    size = (len(xml_text) // 1024).bit_length()
+    return kind, templates, size
+
+
+# ============================================================
+#                     STATS + SELECTION
+# ============================================================
+
+class ProfileStats:
+    """
+    SQLite log of (features, profile, runtime, timed out) per verifyta run.
+    """
+
+    def __init__(self, db_path: str = PROFILE_STATS_DB,
+                 max_runs: int = PROFILE_STATS_RETENTION_RUNS,
+                 max_age_days: float = PROFILE_STATS_RETENTION_DAYS):
+        self.db_path = db_path
+        self.max_runs = max_runs
+        self.max_age_days = max_age_days
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Created on first use (importing has no side effects); one
+        # connection per call, as in ArtifactStore
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    if self.db_path == PROFILE_STATS_DB:
+                        ensure_result_dir()
+                    os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                    with closing(sqlite3.connect(self.db_path, timeout=30)) as db:
+                        db.executescript(_SCHEMA)
+                    self._ready = True
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def record(self, features, profile: str, seconds: float, timed_out: bool):
+        """
+        Stores one run and applies retention in the same transaction, so
+        the table never grows past max_runs.
+        """
+        kind, templates, size = features
+        now = time.time()
+        with closing(self._connect()) as db, db:
+            cur = db.execute(
+                "INSERT INTO profile_runs (created, kind, templates, size, profile, seconds, timed_out) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (now, kind, templates, size, profile, seconds, int(timed_out)),
+            )
+            # ids are monotonic, so "newest max_runs" is an id range
+            db.execute(
+                "DELETE FROM profile_runs WHERE id <= ? OR created < ?",
+                (cur.lastrowid - self.max_runs, now - self.max_age_days * 86400),
+            )
+
+    def costs(self, features):
+        """
+        (mean cost, runs) per profile for the closest recorded match: same
+        kind, template and size buckets, else same kind only.
+        """
+        kind, templates, size = features
+        queries = [
+            ("kind = ? AND templates = ? AND size = ?", (kind, templates, size)),
+            ("kind = ?", (kind,)),
+        ]
+        with closing(self._connect()) as db:
+            for where, args in queries:
+                rows = db.execute(
+                    f"SELECT profile, seconds, timed_out FROM profile_runs WHERE {where}",
+                    args,
+                ).fetchall()
+                if rows:
+                    break
+            else:
+                return {}
+
+        totals = {}
+        for profile, seconds, timed_out in rows:
+            if timed_out:
+                seconds *= _TIMEOUT_PENALTY
+            n, total = totals.get(profile, (0, 0.0))
+            totals[profile] = (n + 1, total + seconds)
+        return {p: (total / n, n) for p, (n, total) in totals.items()}
+
+    def plan(self, requested: str, features, explore=None):
+        """
+        Profiles to try, in order: the requested one (or, for "auto", the
+        cheapest one recorded for similar models) followed by escalation
+        candidates. Profiles never tried on similar models come after the
+        ones that finished in time there, in default order, but before
+        the ones that mostly timed out. With features None the recorded
+        stats are not consulted.
+
+        Ranking alone never revisits a profile once another one finishes
+        in time, so with probability `explore` (default
+        VERIFYTA_EXPLORE_RATE) the least-sampled profile with fewer than
+        VERIFYTA_EXPLORE_SAMPLES runs goes first instead.
+        """
+        if requested == AUTO:
+            costs = self.costs(features) if features is not None else {}
+
+            def rank(p):
+                if p not in costs:
+                    return 1, _DEFAULT_ORDER.index(p)
+                cost = costs[p][0]
+                return (0 if cost < PROFILES[p]["timeout"] else 2), cost
+
+            order = sorted(_DEFAULT_ORDER, key=rank)
+
+            if explore is None:
+                explore = VERIFYTA_EXPLORE_RATE
+            samples = {p: costs[p][1] if p in costs else 0 for p in order}
+            candidates = [p for p in order[1:] if samples[p] < VERIFYTA_EXPLORE_SAMPLES]
+            if costs and candidates and random.random() < explore:
+                pick = min(candidates, key=samples.get)
+                order.remove(pick)
+                order.insert(0, pick)
+        else:
+            order = [requested] + [p for p in _DEFAULT_ORDER if p != requested]
+        return order[:1 + VERIFYTA_MAX_ESCALATIONS]
+
+
+_stats = None
+
+
+def get_stats() -> ProfileStats:
+    global _stats
+    if _stats is None:
+        _stats = ProfileStats()
+    return _stats
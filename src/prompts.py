@@ -136,6 +136,10 @@ Your goal:
 - Fix the XML so that UPPAAL verifyta accepts it.
 - Preserve the intended behavior as much as possible.
 - Enforce the same structural and synchronisation rules as the generator.
+- If a [counterexample] path is given, it is the sequence of states and
+  transitions leading to the violated property: fix the guard, update or
+  missing transition that makes that path possible.
+- Do NOT break properties that are already satisfied.
 - Do NOT embed queries in the XML.
 - Return ONLY the corrected <nta>...</nta> block.
 
@@ -212,15 +216,19 @@ system P0, P1;
 """
 
 
-def build_repair_prompt(broken: str, verifier_msg: str, queries: list[str]) -> str:
+def build_repair_prompt(broken: str, verifier_msg: str, queries: list[str], progress: str = "") -> str:
     """
     Build the LLM prompt for repairing a broken UPPAAL XML string.
 
     - `broken`: the current (possibly invalid) XML.
-    - `verifier_msg`: error output from verifyta to guide the repair.
+    - `verifier_msg`: error output from verifyta to guide the repair
+      (counterexamples already summarised, see traces.py).
     - `queries`: given only as context; must NOT be embedded as <query>.
+    - `progress`: how property outcomes changed since the previous
+      attempt (traces.diff_properties); omitted when empty.
     """
     qs = "\n".join(queries)
+    progress = f"\nCHANGES SINCE THE PREVIOUS ATTEMPT:\n{progress}\n" if progress else ""
     return f"""{REPAIR_INSTR}
 
 BROKEN XML (model to fix):
@@ -228,9 +236,66 @@ BROKEN XML (model to fix):
 
 VERIFYTA ERROR MESSAGE:
 {verifier_msg}
-
+{progress}
 PROPERTIES (context ONLY — do NOT embed into XML):
 {qs}
 
 Return ONLY the corrected <nta>...</nta> XML.
 """
+
+
+PARTIAL_REPAIR_INSTR = """
+You are repairing PART of a UPPAAL XML model.
+
+verifyta reported errors inside the fragment(s) below. The rest of the
+model is correct and is only summarised for context; do NOT output it.
+
+Your goal:
+- Fix ONLY the given fragment(s) so that UPPAAL verifyta accepts the model.
+- Preserve the intended behavior as much as possible.
+- Keep the same template names, location ids and channel names unless
+  they are the cause of the error.
+- Follow the same label and synchronisation rules as the full repair:
+    <label kind="guard">...</label>
+    <label kind="synchronisation">start!</label> / start? (no spaces)
+    <label kind="assignment">x = 0</label>
+
+OUTPUT (MUST FOLLOW STRICTLY)
+-----------------------------
+- Return ONLY the replacement fragment(s), in the same order, wrapped as:
+
+  <fragments>
+    <template>...</template>
+  </fragments>
+
+- One replacement element per given fragment (<template> or <declaration>).
+- No <nta>, no <system>, no markdown, no explanations.
+"""
+
+
+def build_partial_repair_prompt(fragments: str, summary: str, verifier_msg: str, queries: list[str]) -> str:
+    """
+    Build the LLM prompt for a targeted repair.
+
+    - `fragments`: the failing <template>/<declaration> element(s).
+    - `summary`: compact description of the rest of the model.
+    - `verifier_msg`: error output from verifyta.
+    - `queries`: given only as context.
+    """
+    qs = "\n".join(queries)
+    return f"""{PARTIAL_REPAIR_INSTR}
+
+FRAGMENT(S) TO FIX:
+{fragments}
+
+REST OF THE MODEL (summary, do NOT output):
+{summary}
+
+VERIFYTA ERROR MESSAGE:
+{verifier_msg}
+
+PROPERTIES (context ONLY):
+{qs}
+
+Return ONLY <fragments>...</fragments>.
+"""
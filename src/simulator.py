@@ -0,0 +1,712 @@
+# simulator.py
+
+"""
+Embedded explorer for discrete (clock-free) UPPAAL models.
+
+Answers simple queries in-process, without a verifyta subprocess:
+
+    E<> phi          (reachability)
+    A[] phi          (invariance, incl. A[] not deadlock)
+
+phi may use process locations (P.S), global and process-local variables,
+integer arithmetic, comparisons, ! && || not and or, and `deadlock`.
+
+State encoding: a tuple of location indices plus a bounded int vector
+(NumPy int32 array when NumPy is installed, array('i') otherwise). The
+visited set stores (locations, vector.tobytes()). Exploration is BFS with
+a state budget.
+
+Anything outside that fragment (clocks, broadcast channels, arrays,
+functions, template parameters, select, other query kinds, runtime range
+errors, exhausted budget) yields None for the query.
+
+The explorer's parser is looser than verifyta's (e.g. it does not reject
+a missing ';' or duplicate location names), so verify_model only uses it
+to fail attempts early; satisfied results are confirmed by verifyta.
+"""
+
+import re
+from array import array
+from collections import deque
+
+from config import SIMULATOR_MAX_STATES
+from xml_utils import build_model_ir
+
+# NumPy is imported on the first explore(), not with the module: the
+# pipeline imports this module, and a lazily booted worker should not pay
+# for NumPy before it verifies anything
+np = None
+_np_checked = False
+
+
+def _load_numpy():
+    global np, _np_checked
+    if not _np_checked:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:  # pragma: no cover - depends on environment
+            pass
+        _np_checked = True
+
+
+class Unsupported(Exception):
+    """
+    The model or query is outside the fragment the explorer handles.
+    """
+
+
+INT_MIN, INT_MAX = -32768, 32767
+
+
+# ============================================================
+#                        TOKENIZER
+# ============================================================
+
+_TOKEN_RE = re.compile(
+    r"""
+    \s*(?:
+        (?P<num>\d+)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<op>\+\+|--|\+=|-=|\*=|/=|:=|==|!=|<=|>=|&&|\|\||[-+*/%<>=!().,?:\[\]{}])
+    )
+    """,
+    re.VERBOSE,
+)
+
+
+def _tokenize(text: str):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if not m or m.end() == pos:
+            raise Unsupported(f"cannot tokenize {text[pos:pos + 20]!r}")
+        pos = m.end()
+        if m.group("num") is not None:
+            tokens.append(("num", int(m.group("num"))))
+        elif m.group("name") is not None:
+            tokens.append(("name", m.group("name")))
+        elif m.group("op") is not None:
+            tokens.append(("op", m.group("op")))
+    return tokens
+
+
+# ============================================================
+#                 EXPRESSION PARSER / COMPILER
+# ============================================================
+#
+# Expressions are compiled into closures f(locs, vec) -> int.
+# `resolve(name, member)` maps identifiers to closures at compile time.
+
+def _c_div(a, b):
+    if b == 0:
+        raise Unsupported("division by zero")
+    q = abs(a) // abs(b)
+    return q if (a >= 0) == (b >= 0) else -q
+
+
+def _c_mod(a, b):
+    return a - b * _c_div(a, b)
+
+
+_BINARY = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": _c_div,
+    "%": _c_mod,
+    "<": lambda a, b: int(a < b),
+    "<=": lambda a, b: int(a <= b),
+    ">": lambda a, b: int(a > b),
+    ">=": lambda a, b: int(a >= b),
+    "==": lambda a, b: int(a == b),
+    "!=": lambda a, b: int(a != b),
+}
+
+# Precedence levels, lowest first (C-like; 'not' binds looser than ==)
+_LEVELS = [
+    ("or", {"||", "or"}),
+    ("and", {"&&", "and"}),
+    ("not", None),
+    ("eq", {"==", "!="}),
+    ("rel", {"<", "<=", ">", ">="}),
+    ("add", {"+", "-"}),
+    ("mul", {"*", "/", "%"}),
+]
+
+
+class _Parser:
+
+    def __init__(self, tokens, resolve):
+        self.tokens = tokens
+        self.pos = 0
+        self.resolve = resolve
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        tok = self.peek()
+        self.pos += 1
+        return tok
+
+    def expect(self, value):
+        tok = self.take()
+        if tok[1] != value:
+            raise Unsupported(f"expected {value!r}, got {tok[1]!r}")
+
+    def at_end(self):
+        return self.pos >= len(self.tokens)
+
+    # ---------------------------------------------------------
+    def expr(self, level=0):
+        if level == len(_LEVELS):
+            return self.unary()
+
+        name, ops = _LEVELS[level]
+
+        if name == "not":
+            if self.peek() == ("name", "not"):
+                self.take()
+                f = self.expr(level)
+                return lambda locs, vec: int(not f(locs, vec))
+            return self.expr(level + 1)
+
+        left = self.expr(level + 1)
+        while self.peek()[1] in ops and self.peek()[0] in ("op", "name"):
+            op = self.take()[1]
+            right = self.expr(level + 1)
+            left = self._combine(name, op, left, right)
+
+        if name == "rel" and self.peek()[1] in ops:
+            # a < b < c means (a < b) < c in C but not in Python; reject
+            raise Unsupported("chained comparison")
+        return left
+
+    @staticmethod
+    def _combine(level, op, left, right):
+        if level == "or":
+            return lambda locs, vec: int(bool(left(locs, vec)) or bool(right(locs, vec)))
+        if level == "and":
+            return lambda locs, vec: int(bool(left(locs, vec)) and bool(right(locs, vec)))
+        fn = _BINARY[op]
+        return lambda locs, vec: fn(left(locs, vec), right(locs, vec))
+
+    def unary(self):
+        kind, value = self.peek()
+        if kind == "op" and value == "!":
+            self.take()
+            f = self.unary()
+            return lambda locs, vec: int(not f(locs, vec))
+        if kind == "op" and value == "-":
+            self.take()
+            f = self.unary()
+            return lambda locs, vec: -f(locs, vec)
+        if kind == "op" and value == "+":
+            self.take()
+            return self.unary()
+        return self.primary()
+
+    def primary(self):
+        kind, value = self.take()
+
+        if kind == "num":
+            return lambda locs, vec, v=value: v
+
+        if kind == "op" and value == "(":
+            f = self.expr()
+            self.expect(")")
+            return f
+
+        if kind == "name":
+            if value == "true":
+                return lambda locs, vec: 1
+            if value == "false":
+                return lambda locs, vec: 0
+            if self.peek() == ("op", "."):
+                self.take()
+                mkind, member = self.take()
+                if mkind != "name":
+                    raise Unsupported("bad member access")
+                return self.resolve(value, member)
+            if self.peek()[1] in ("(", "["):
+                raise Unsupported("function calls / arrays")
+            return self.resolve(value, None)
+
+        raise Unsupported(f"unexpected token {value!r}")
+
+
+def _compile_expr(text: str, resolve):
+    tokens = _tokenize(text)
+    if not tokens:
+        raise Unsupported("empty expression")
+    p = _Parser(tokens, resolve)
+    f = p.expr()
+    if not p.at_end():
+        raise Unsupported(f"trailing tokens in {text!r}")
+    return f
+
+
+# ============================================================
+#                        DECLARATIONS
+# ============================================================
+
+_COMMENT_RE = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+
+_DECL_RE = re.compile(
+    r"""
+    ^(?P<const>const\s+)?
+     (?P<prefix>(?:(?:urgent|broadcast|meta)\s+)*)
+     (?P<type>int|bool|chan|clock)
+     \s*(?:\[(?P<lo>[^,\]]+),(?P<hi>[^\]]+)\])?
+     \s+(?P<rest>.+)$
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+class _Scope:
+    """
+    Variables, constants and channels visible from one process
+    (its locals shadow the globals).
+    """
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.consts = {}
+        self.vars = {}       # name -> slot in the state vector
+        self.chans = set()
+
+    def lookup_const(self, name):
+        if name in self.consts:
+            return self.consts[name]
+        return self.parent.lookup_const(name) if self.parent else None
+
+    def lookup_var(self, name):
+        if name in self.vars:
+            return self.vars[name]
+        return self.parent.lookup_var(name) if self.parent else None
+
+    def has_chan(self, name):
+        if name in self.chans:
+            return True
+        return self.parent.has_chan(name) if self.parent else False
+
+
+def _split_top_level(text: str, sep: str):
+    """
+    Split on `sep` outside brackets/parentheses.
+    """
+    parts, depth, cur = [], 0, []
+    for ch in text:
+        if ch in "([{":
+            depth += 1
+        elif ch in ")]}":
+            depth -= 1
+        if ch == sep and depth == 0:
+            parts.append("".join(cur))
+            cur = []
+        else:
+            cur.append(ch)
+    parts.append("".join(cur))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _const_resolver(scope: _Scope):
+    def resolve(name, member):
+        if member is None:
+            v = scope.lookup_const(name)
+            if v is not None:
+                return lambda locs, vec, v=v: v
+        raise Unsupported(f"non-constant {name!r} in declaration")
+    return resolve
+
+
+def _declare(text: str, scope: _Scope, slots: list):
+    """
+    Parse declarations into `scope`; appends (initial, lo, hi) to `slots`.
+    """
+    text = _COMMENT_RE.sub(" ", text or "")
+    if "{" in text or "}" in text:
+        raise Unsupported("functions / structs / initialiser lists")
+
+    const_eval = _const_resolver(scope)
+
+    for stmt in text.split(";"):
+        stmt = stmt.strip()
+        if not stmt:
+            continue
+
+        m = _DECL_RE.match(stmt)
+        if not m:
+            raise Unsupported(f"declaration {stmt!r}")
+
+        typ = m.group("type")
+        prefixes = (m.group("prefix") or "").split()
+        if typ == "clock":
+            raise Unsupported("clocks")
+        if "broadcast" in prefixes or "meta" in prefixes:
+            raise Unsupported("broadcast / meta declarations")
+
+        if typ == "bool":
+            lo, hi = 0, 1
+        elif m.group("lo") is not None:
+            lo = _compile_expr(m.group("lo"), const_eval)(None, None)
+            hi = _compile_expr(m.group("hi"), const_eval)(None, None)
+        else:
+            lo, hi = INT_MIN, INT_MAX
+
+        for decl in _split_top_level(m.group("rest"), ","):
+            name, _, init = decl.partition("=")
+            name = name.strip()
+            if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name):
+                raise Unsupported(f"declarator {decl!r}")
+
+            if typ == "chan":
+                if init:
+                    raise Unsupported("channel initialiser")
+                scope.chans.add(name)
+                continue
+
+            value = _compile_expr(init, const_eval)(None, None) if init.strip() else 0
+            if typ == "bool":
+                value = int(bool(value))
+
+            if m.group("const"):
+                scope.consts[name] = value
+                continue
+
+            if not lo <= value <= hi:
+                raise Unsupported(f"initial value of {name!r} out of range")
+            scope.vars[name] = len(slots)
+            slots.append((value, lo, hi))
+
+
+# ============================================================
+#                        COMPILED MODEL
+# ============================================================
+
+class _Edge:
+    __slots__ = ("proc", "target", "guard", "chan", "send", "updates")
+
+
+class DiscreteModel:
+    """
+    Compiled network of clock-free processes.
+    """
+
+    def __init__(self, ir):
+        if not ir or not ir["processes"]:
+            raise Unsupported("no processes")
+
+        self.global_scope = _Scope()
+        slots = []
+        _declare(ir["declaration"], self.global_scope, slots)
+
+        self.proc_names = []
+        self.proc_index = {}
+        self.loc_names = []      # per process: {name: index}
+        self.committed = []      # per process: set of location indices
+        self.invariants = []     # per process: list of closure/None
+        self.edges = []          # per process: list (per location) of [_Edge]
+        self.scopes = []
+        init_locs = []
+
+        for p, (pname, tname) in enumerate(ir["processes"]):
+            tmpl = ir["templates"].get(tname)
+            if tmpl is None:
+                raise Unsupported(f"unknown template {tname!r}")
+            if tmpl["parameters"]:
+                raise Unsupported("template parameters")
+            if tmpl["init"] is None:
+                raise Unsupported(f"template {tname!r} has no initial location")
+
+            scope = _Scope(self.global_scope)
+            _declare(tmpl["declaration"], scope, slots)
+            self.scopes.append(scope)
+
+            self.proc_names.append(pname)
+            self.proc_index[pname] = p
+            self.loc_names.append({
+                loc["name"]: i for i, loc in enumerate(tmpl["locations"]) if loc["name"]
+            })
+            self.committed.append({i for i, loc in enumerate(tmpl["locations"]) if loc["committed"]})
+            init_locs.append(tmpl["init"])
+
+        self.slots = slots
+        self.lo = [lo for _, lo, _ in slots]
+        self.hi = [hi for _, _, hi in slots]
+        self.init_vec = [v for v, _, _ in slots]
+        self.init_locs = tuple(init_locs)
+
+        # Compile labels once all scopes (and locals of every process) exist
+        for p, (pname, tname) in enumerate(ir["processes"]):
+            tmpl = ir["templates"][tname]
+            resolve = self._resolver(self.scopes[p])
+
+            self.invariants.append([
+                _compile_expr(loc["invariant"], resolve) if loc["invariant"] else None
+                for loc in tmpl["locations"]
+            ])
+
+            out = [[] for _ in tmpl["locations"]]
+            for t in tmpl["transitions"]:
+                if t["source"] is None or t["target"] is None:
+                    raise Unsupported("dangling transition")
+                if t["select"]:
+                    raise Unsupported("select")
+
+                e = _Edge()
+                e.proc = p
+                e.target = t["target"]
+                e.guard = _compile_expr(t["guard"], resolve) if t["guard"] else None
+                e.chan, e.send = self._parse_sync(t["sync"], self.scopes[p])
+                e.updates = self._compile_updates(t["assignment"], self.scopes[p], resolve)
+                out[t["source"]].append(e)
+            self.edges.append(out)
+
+    # ---------------------------------------------------------
+    def _resolver(self, scope: _Scope):
+        def resolve(name, member):
+            if member is not None:
+                return self._member(name, member)
+            if name == "deadlock":
+                raise Unsupported("deadlock inside model labels")
+            v = scope.lookup_const(name)
+            if v is not None:
+                return lambda locs, vec, v=v: v
+            slot = scope.lookup_var(name)
+            if slot is not None:
+                return lambda locs, vec, s=slot: int(vec[s])
+            raise Unsupported(f"unknown identifier {name!r}")
+        return resolve
+
+    def _member(self, proc, member):
+        p = self.proc_index.get(proc)
+        if p is None:
+            raise Unsupported(f"unknown process {proc!r}")
+        loc = self.loc_names[p].get(member)
+        if loc is not None:
+            return lambda locs, vec, p=p, l=loc: int(locs[p] == l)
+        slot = self.scopes[p].vars.get(member)
+        if slot is not None:
+            return lambda locs, vec, s=slot: int(vec[s])
+        raise Unsupported(f"{proc}.{member}")
+
+    @staticmethod
+    def _parse_sync(text: str, scope: _Scope):
+        if not text:
+            return None, None
+        m = re.fullmatch(r"\s*([A-Za-z_][A-Za-z0-9_]*)\s*([!?])\s*", text)
+        if not m or not scope.has_chan(m.group(1)):
+            raise Unsupported(f"synchronisation {text!r}")
+        return m.group(1), m.group(2) == "!"
+
+    @staticmethod
+    def _compile_updates(text: str, scope: _Scope, resolve):
+        updates = []
+        for part in _split_top_level(text or "", ","):
+            tokens = _tokenize(part)
+            if len(tokens) < 2 or tokens[0][0] != "name":
+                raise Unsupported(f"update {part!r}")
+
+            slot = scope.lookup_var(tokens[0][1])
+            if slot is None:
+                raise Unsupported(f"update of {tokens[0][1]!r}")
+
+            op = tokens[1][1]
+            if op in ("++", "--") and len(tokens) == 2:
+                step = 1 if op == "++" else -1
+                updates.append((slot, lambda locs, vec, s=slot, d=step: int(vec[s]) + d))
+                continue
+
+            if op not in ("=", ":=", "+=", "-=", "*=", "/="):
+                raise Unsupported(f"update {part!r}")
+
+            p = _Parser(tokens[2:], resolve)
+            rhs = p.expr()
+            if not p.at_end():
+                raise Unsupported(f"update {part!r}")
+
+            if op in ("=", ":="):
+                updates.append((slot, rhs))
+            else:
+                fn = _BINARY[op[0]]
+                updates.append((slot, lambda locs, vec, s=slot, f=rhs, fn=fn: fn(int(vec[s]), f(locs, vec))))
+        return updates
+
+    # ---------------------------------------------------------
+    def query_predicate(self, text: str):
+        resolve = self._resolver(self.global_scope)
+
+        def query_resolve(name, member):
+            if member is None and name == "deadlock":
+                # per-state flag carried by _StateView
+                return lambda locs, vec: vec.deadlock
+            return resolve(name, member)
+
+        return _compile_expr(text, query_resolve)
+
+
+# ============================================================
+#                        EXPLORATION
+# ============================================================
+
+class _StateView:
+    """
+    Vector wrapper that also exposes the deadlock flag to query predicates.
+    """
+    __slots__ = ("vec", "deadlock")
+
+    def __init__(self, vec, deadlock):
+        self.vec = vec
+        self.deadlock = deadlock
+
+    def __getitem__(self, i):
+        return self.vec[i]
+
+
+def _new_vec(values):
+    if np is not None:
+        return np.array(values, dtype=np.int32)
+    return array("i", values)
+
+
+def _copy_vec(vec):
+    return vec.copy() if np is not None else array("i", vec)
+
+
+def _successors(model: DiscreteModel, locs, vec):
+    """
+    Yields (locs, vec) successors of a state.
+    """
+    committed = [p for p, l in enumerate(locs) if l in model.committed[p]]
+
+    def enabled(e):
+        return e.guard is None or e.guard(locs, vec)
+
+    def apply(edges):
+        new = _copy_vec(vec)
+        new_locs = list(locs)
+        for e in edges:
+            for slot, f in e.updates:
+                value = f(new_locs, new)
+                if not model.lo[slot] <= value <= model.hi[slot]:
+                    raise Unsupported("value out of range")
+                new[slot] = value
+            new_locs[e.proc] = e.target
+        new_locs = tuple(new_locs)
+        for p, l in enumerate(new_locs):
+            inv = model.invariants[p][l]
+            if inv is not None and not inv(new_locs, new):
+                return None
+        return new_locs, new
+
+    for p, l in enumerate(locs):
+        for e in model.edges[p][l]:
+            if e.chan is not None and not e.send:
+                continue   # receivers are handled from their sender
+            if not enabled(e):
+                continue
+
+            if e.chan is None:
+                if committed and p not in committed:
+                    continue
+                succ = apply([e])
+                if succ is not None:
+                    yield succ
+                continue
+
+            for q, lq in enumerate(locs):
+                if q == p:
+                    continue
+                if committed and p not in committed and q not in committed:
+                    continue
+                for r in model.edges[q][lq]:
+                    if r.chan == e.chan and not r.send and enabled(r):
+                        succ = apply([e, r])
+                        if succ is not None:
+                            yield succ
+
+
+_QUERY_RE = re.compile(r"^\s*(E<>|A\[\])\s*(.+?)\s*$", re.DOTALL)
+
+
+def explore(model: DiscreteModel, queries: list[str], max_states: int = SIMULATOR_MAX_STATES):
+    """
+    BFS over the discrete state space. Returns one result per query:
+    True / False, or None if the query is unsupported or the budget ran out.
+    """
+    results = [None] * len(queries)
+
+    # (index, is_E, predicate)
+    pending = []
+    for i, q in enumerate(queries):
+        m = _QUERY_RE.match(q)
+        if not m:
+            continue
+        try:
+            pending.append((i, m.group(1) == "E<>", model.query_predicate(m.group(2))))
+        except Unsupported:
+            continue
+
+    if not pending:
+        return results
+
+    _load_numpy()
+    init_vec = _new_vec(model.init_vec)
+    for p, l in enumerate(model.init_locs):
+        inv = model.invariants[p][l]
+        if inv is not None and not inv(model.init_locs, init_vec):
+            return results   # verifyta reports this; do not guess
+
+    start = (model.init_locs, init_vec)
+    visited = {(model.init_locs, init_vec.tobytes())}
+    queue = deque([start])
+
+    while queue and pending:
+        locs, vec = queue.popleft()
+        succs = list(_successors(model, locs, vec))
+        view = _StateView(vec, int(not succs))
+
+        still = []
+        for i, is_e, pred in pending:
+            holds = bool(pred(locs, view))
+            if is_e and holds:
+                results[i] = True       # witness found
+            elif not is_e and not holds:
+                results[i] = False      # counterexample found
+            else:
+                still.append((i, is_e, pred))
+        pending = still
+
+        for s_locs, s_vec in succs:
+            key = (s_locs, s_vec.tobytes())
+            if key in visited:
+                continue
+            if len(visited) >= max_states:
+                # Budget exhausted: unresolved queries stay None
+                return results
+            visited.add(key)
+            queue.append((s_locs, s_vec))
+
+    # Full state space explored: remaining E<> are false, A[] are true
+    if not queue:
+        for i, is_e, _ in pending:
+            results[i] = not is_e
+
+    return results
+
+
+def precheck(xml_data, queries: list[str], max_states: int = SIMULATOR_MAX_STATES):
+    """
+    Try to answer queries in-process. Returns a list of True / False / None
+    (None = hand over to verifyta).
+    """
+    try:
+        model = DiscreteModel(build_model_ir(xml_data))
+        return explore(model, queries, max_states)
+    except Unsupported:
+        return [None] * len(queries)
@@ -0,0 +1,280 @@
+# slicing.py
+
+"""
+Query-aware model slicing.
+
+verifyta explores the product of every process in <system>, even when a
+query only talks about one of them. For each query we compute the set of
+processes it references (directly, or through global variables), close
+that set over shared channels / variables, and emit a sub-network that
+only instantiates those processes.
+
+The slice is sound for the queries it is used for:
+- every process that can synchronise with, or read/write the same global
+  state as, a kept process is kept as well (transitive closure); calling
+  a global function counts as using every global its body touches;
+- processes with committed / urgent locations or invariants can block
+  time or interleavings of the others, so they are always kept;
+- only safety / reachability queries (A[], E<>) are sliced: deadlock
+  queries concern the whole network, and liveness (A<>, E[], -->) can
+  change once a process with a loop is removed (no fairness in UPPAAL).
+"""
+
+import re
+import xml.etree.ElementTree as ET
+
+
+# Identifiers like P0, idle, x, req
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# Process.location references in a query, e.g. P0.busy
+_PROC_REF_RE = re.compile(r"\b([A-Za-z_][A-Za-z0-9_]*)\s*\.\s*[A-Za-z_][A-Za-z0-9_]*")
+
+# 'P0 = Worker();' lines in the <system> block
+_INSTANCE_RE = re.compile(r"([A-Za-z_][A-Za-z0-9_]*)\s*=\s*([A-Za-z_][A-Za-z0-9_]*)\s*\(\s*\)\s*;")
+
+# Queries mentioning these keywords concern the whole network
+_GLOBAL_KEYWORDS = {"deadlock"}
+
+# Only these query forms may be checked on a slice
+_SLICEABLE_PREFIXES = ("A[]", "E<>")
+
+# Words that are never user identifiers (query syntax, types, statements)
+_RESERVED = {
+    "A", "E", "not", "and", "or", "imply", "true", "false",
+    "deadlock", "forall", "exists", "sum",
+    "int", "bool", "clock", "chan", "double", "void", "const", "urgent",
+    "broadcast", "meta", "scalar", "struct", "typedef", "return", "if",
+    "else", "for", "while", "do", "break", "continue", "select", "guard",
+    "sync", "assign", "process", "system", "priority", "default",
+}
+
+# Global function definitions: 'void inc()' / 'int f(int a) {'
+_FUNC_RE = re.compile(r"\b[A-Za-z_][A-Za-z0-9_]*\s+([A-Za-z_][A-Za-z0-9_]*)\s*\([^()]*\)\s*\{")
+
+# Label kinds whose text can reference global state
+_LABEL_KINDS = {"guard", "synchronisation", "assignment", "invariant", "select"}
+
+
+# ============================================================
+#                   MODEL INSPECTION
+# ============================================================
+
+def _identifiers(text: str) -> set[str]:
+    if not text:
+        return set()
+    return set(_IDENT_RE.findall(text))
+
+
+def _function_uses(decl_text: str, globals_: set[str]) -> dict[str, set[str]]:
+    """
+    Global function name -> globals its body touches, including through
+    calls to other global functions.
+    """
+    uses = {}
+    for m in _FUNC_RE.finditer(decl_text or ""):
+        # Body = the matching brace block
+        depth, i = 1, m.end()
+        while i < len(decl_text) and depth:
+            depth += {"{": 1, "}": -1}.get(decl_text[i], 0)
+            i += 1
+        uses[m.group(1)] = _identifiers(decl_text[m.end():i]) & globals_
+
+    changed = True
+    while changed:
+        changed = False
+        for fn, idents in uses.items():
+            for callee in idents & uses.keys():
+                extra = uses[callee] - idents
+                if extra:
+                    idents |= extra
+                    changed = True
+    return uses
+
+
+def _pinned(template: ET.Element) -> bool:
+    """
+    Templates whose processes can stop time or force interleavings
+    (committed / urgent locations, invariants) for the whole network.
+    """
+    for loc in template.findall("location"):
+        if loc.find("committed") is not None or loc.find("urgent") is not None:
+            return True
+        for label in loc.findall("label"):
+            if label.get("kind") == "invariant" and (label.text or "").strip():
+                return True
+    return False
+
+
+def _template_identifiers(template: ET.Element) -> set[str]:
+    """
+    All identifiers used in labels and local declarations of a template.
+    """
+    idents = set()
+
+    decl = template.find("declaration")
+    if decl is not None:
+        idents |= _identifiers(decl.text)
+
+    for label in template.iter("label"):
+        if label.get("kind") in _LABEL_KINDS:
+            idents |= _identifiers(label.text)
+
+    return idents
+
+
+def _process_instances(root: ET.Element) -> list[tuple[str, str]]:
+    """
+    Returns [(process_name, template_name), ...] in <system> order.
+    """
+    sys_elem = root.find("system")
+    if sys_elem is None or not sys_elem.text:
+        return []
+    return _INSTANCE_RE.findall(sys_elem.text)
+
+
+# ============================================================
+#                   DEPENDENCY CLOSURE
+# ============================================================
+
+def _query_processes(query: str, globals_: set[str], proc_uses: dict[str, set[str]]):
+    """
+    Processes a query depends on directly, or None if the query
+    concerns the whole network.
+    """
+    idents = _identifiers(query)
+    if idents & _GLOBAL_KEYWORDS:
+        return None
+    if not query.strip().startswith(_SLICEABLE_PREFIXES) or "-->" in query:
+        return None
+
+    procs = {p for p in _PROC_REF_RE.findall(query) if p in proc_uses}
+
+    # Global variables in the query pull in every process touching them
+    vars_ = (idents & globals_) - _RESERVED
+    for proc, uses in proc_uses.items():
+        if uses & vars_:
+            procs.add(proc)
+
+    if not procs:
+        return None
+
+    return procs
+
+
+def _closure(start: set[str], proc_uses: dict[str, set[str]], globals_: set[str]) -> set[str]:
+    """
+    Transitive closure over shared global identifiers
+    (channels, variables, clocks).
+    """
+    keep = set(start)
+    shared = set()
+    for p in keep:
+        shared |= proc_uses[p] & globals_
+
+    changed = True
+    while changed:
+        changed = False
+        for proc, uses in proc_uses.items():
+            if proc in keep:
+                continue
+            if uses & shared:
+                keep.add(proc)
+                shared |= uses & globals_
+                changed = True
+
+    return keep
+
+
+# ============================================================
+#                   SLICE CONSTRUCTION
+# ============================================================
+
+def _build_slice(root: ET.Element, instances, keep: set[str]) -> bytes:
+    """
+    Copy of the model with only the kept processes instantiated.
+
+    Templates are all kept (uninstantiated ones add nothing to the state
+    space), so template indices in verifyta diagnostics still match the
+    full model.
+    """
+    sliced = ET.Element(root.tag, root.attrib)
+    for child in root:
+        if child.tag != "system":
+            sliced.append(child)
+
+    sys_elem = ET.SubElement(sliced, "system")
+    lines = [f"{p} = {t}();" for p, t in instances if p in keep]
+    lines.append(f"system {', '.join(p for p, _ in instances if p in keep)};")
+    sys_elem.text = "\n" + "\n".join(lines) + "\n"
+
+    return ET.tostring(sliced, encoding="utf-8")
+
+
+def slice_queries(xml_text, queries: list[str]):
+    """
+    Groups queries by the smallest sound sub-network they can be checked on.
+    `xml_text` may be str or UTF-8 bytes; sliced models are UTF-8 bytes.
+
+    Returns a list of (xml, query_indices, kept_processes) tuples.
+    Queries that cannot be sliced are grouped against the full model,
+    with kept_processes set to None.
+    """
+    full = [(xml_text, list(range(len(queries))), None)]
+
+    try:
+        root = ET.fromstring(xml_text)
+    except ET.ParseError:
+        return full
+
+    instances = _process_instances(root)
+    if len(instances) < 2:
+        return full
+
+    templates = {}
+    for tmpl in root.findall("template"):
+        name = tmpl.find("name")
+        if name is not None and name.text:
+            templates[name.text.strip()] = tmpl
+
+    if any(t not in templates for _, t in instances):
+        return full
+
+    decl = root.find("declaration")
+    decl_text = decl.text if decl is not None and decl.text else ""
+    globals_ = _identifiers(decl_text) - _RESERVED
+    functions = _function_uses(decl_text, globals_)
+
+    proc_uses = {}
+    for p, t in instances:
+        uses = _template_identifiers(templates[t])
+        for fn in uses & functions.keys():
+            uses |= functions[fn]
+        proc_uses[p] = uses
+
+    pinned = {p for p, t in instances if _pinned(templates[t])}
+
+    # Group queries that end up with the same slice
+    groups = {}
+    order = []
+    for i, q in enumerate(queries):
+        start = _query_processes(q, globals_, proc_uses)
+        if start is None:
+            key = None
+        else:
+            keep = _closure(start | pinned, proc_uses, globals_)
+            key = None if len(keep) == len(instances) else frozenset(keep)
+
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append(i)
+
+    slices = []
+    for key in order:
+        if key is None:
+            slices.append((xml_text, groups[key], None))
+        else:
+            slices.append((_build_slice(root, instances, key), groups[key], sorted(key)))
+
+    return slices
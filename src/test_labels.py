@@ -0,0 +1,34 @@
+# test_labels.py
+
+import pytest
+
+from labels import normalize_assignment_text
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("x = 0", "x = 0"),
+    ("x := 0", "x = 0"),
+    ("x = 0, y = 1", "x = 0, y = 1"),
+    ("x = 0; y = 1", "x = 0, y = 1"),
+    ("i++, buf[i][j] -= 1", "i++, buf[i][j] -= 1"),
+    ("x = 0, y = f(a,b)", "x = 0, y = f(a,b)"),
+    ("a[i] = b[max(i,j)] + 1", "a[i] = b[max(i,j)] + 1"),
+])
+def test_assignment_kept(text, expected):
+    assert normalize_assignment_text(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "ready = !ready",
+    "x = a.b",
+    "t = 0.5",
+    "flag = a && b",
+    "flag = a || b",
+    "ok = x < 3",
+    "x = 0, flag = a && b",   # one bad update drops the whole label
+    "y = f(a,b",
+    "x = 0)",
+    "",
+])
+def test_assignment_dropped(text):
+    assert normalize_assignment_text(text) is None
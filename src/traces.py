@@ -0,0 +1,295 @@
+# traces.py
+
+"""
+Counterexample traces and attempt-to-attempt property diffs.
+
+With a -t option verifyta prints a diagnostic trace for every property
+that has one (counterexample for a failed A[] / A<> / -->, witness for a
+satisfied E<> / E[]):
+
+    State:
+    ( P0.idle P1.wait )
+    P0.t<=3 P0.t-x<2 x=0 y=1
+    Transition:
+      P0.idle -> P0.busy { x < 3, go!, x++ }
+      P1.wait -> P1.got { 1, go?, 1 }
+    State:
+    ...
+
+Traces can run to megabytes, so TraceCollector consumes verifyta's
+output line by line and keeps only the first and last few steps of each
+trace. Variables and clock constraints are shown as changes against the
+previous state, with at most a few constraints per step. The raw trace
+never reaches the verifier log or the repair prompt; a short summary of
+each counterexample does.
+"""
+
+import re
+from collections import deque
+
+from config import TRACE_HEAD_STEPS, TRACE_TAIL_STEPS
+
+
+_STATE_RE = re.compile(r"^State:")
+_TRANSITION_RE = re.compile(r"^Transitions?:")
+_DELAY_RE = re.compile(r"^Delay:\s*(.*)")
+_VALUE_RE = re.compile(r"^([A-Za-z_][\w.\[\]]*)=(-?\w+)$")
+# Clock constraint of the zone: 'x<=3', 'P0.t-x<2', 't(0)-y<=-1'
+_CLOCK = r"[A-Za-z_][\w.\[\]()]*"
+_CONSTRAINT_RE = re.compile(rf"^{_CLOCK}(?:-{_CLOCK})?(?:<=|<|>=|>|==)-?\w+$")
+_FORMULA_RE = re.compile(r"Formula is (NOT )?satisfied")
+
+# Lines that end a trace (the next formula / its result / a new trace)
+_TRACE_END_RE = re.compile(r"^(Verifying formula|-- Formula|Showing )")
+
+# Max characters of one transition's label list in a summary line
+_EDGE_CHARS = 120
+
+# Max new clock constraints shown per step (a zone has O(clocks^2) of them)
+_CONSTRAINTS_SHOWN = 6
+
+
+def _trace_expected(query: str, satisfied: bool) -> bool:
+    """
+    Whether verifyta prints a trace for this query outcome.
+    """
+    q = query.strip()
+    if q.startswith(("E<>", "E[]")):
+        return satisfied
+    return not satisfied
+
+
+class _Trace:
+    """
+    Bounded view of one trace: first `head` and last `tail` steps.
+    """
+
+    def __init__(self, head: int, tail: int):
+        self.head = []
+        self.tail = deque(maxlen=tail)
+        self.head_size = head
+        self.steps = 0
+        self.prev_vars = {}
+        self.prev_constraints = set()
+
+    def add(self, edges, delay, locs, values, constraints=()):
+        changed = {k: v for k, v in values.items() if self.prev_vars.get(k) != v}
+        self.prev_vars = values
+        new = [c for c in constraints if c not in self.prev_constraints]
+        self.prev_constraints = set(constraints)
+
+        parts = []
+        if delay:
+            parts.append(f"delay {delay}")
+        if edges:
+            parts.append(" | ".join(edges))
+        state = f"({', '.join(locs)})"
+        if changed:
+            state += " " + " ".join(f"{k}={v}" for k, v in changed.items())
+        if new:
+            state += " " + " ".join(new[:_CONSTRAINTS_SHOWN])
+            if len(new) > _CONSTRAINTS_SHOWN:
+                state += f" (+{len(new) - _CONSTRAINTS_SHOWN} constraints)"
+        parts.append(state)
+
+        step = (self.steps, " => ".join(parts))
+        if len(self.head) < self.head_size:
+            self.head.append(step)
+        else:
+            self.tail.append(step)
+        self.steps += 1
+
+    def lines(self):
+        out = [f"  {i}: {text}" for i, text in self.head]
+        omitted = self.steps - len(self.head) - len(self.tail)
+        if omitted:
+            out.append(f"  ... {omitted} steps omitted ...")
+        out += [f"  {i}: {text}" for i, text in self.tail]
+        return out
+
+
+class TraceCollector:
+    """
+    Streaming parser for verifyta output with traces.
+
+    feed() every output line; finish(queries) returns the output with the
+    raw traces replaced by summaries of the counterexamples. Memory is
+    bounded by the non-trace output plus head + tail steps per trace.
+    """
+
+    def __init__(self, head: int = TRACE_HEAD_STEPS, tail: int = TRACE_TAIL_STEPS):
+        self._head = head
+        self._tail = tail
+        self.lines = []         # verifyta output without trace lines
+        self.traces = []        # _Trace per trace, in output order
+        self._trace = None
+        self._section = None    # None / "state" / "transition"
+        self._locs = None
+        self._values = {}
+        self._constraints = []
+        self._edges = []
+        self._delay = None
+
+    # ---------------------------------------------------------
+    # PARSING
+    # ---------------------------------------------------------
+    def feed(self, line: str):
+        text = line.strip()
+
+        if _STATE_RE.match(text):
+            if self._trace is None:
+                self._trace = _Trace(self._head, self._tail)
+                self.traces.append(self._trace)
+            self._flush_state()
+            self._section = "state"
+            return
+
+        if self._trace is None:
+            self.lines.append(line.rstrip("\n"))
+            return
+
+        if _TRACE_END_RE.match(text):
+            self._end_trace()
+            self.lines.append(line.rstrip("\n"))
+            return
+
+        if _TRANSITION_RE.match(text):
+            self._flush_state()
+            self._section = "transition"
+            return
+
+        m = _DELAY_RE.match(text)
+        if m:
+            self._flush_state()
+            self._delay = m.group(1)
+            self._section = None
+            return
+
+        if not text:
+            return
+
+        if self._section == "transition":
+            self._edges.append(_compact_edge(text))
+        elif self._section == "state":
+            if self._locs is None and text.startswith("("):
+                self._locs = text.strip("() ").split()
+            else:
+                for token in text.split():
+                    vm = _VALUE_RE.match(token)
+                    if vm:
+                        self._values[vm.group(1)] = vm.group(2)
+                    elif _CONSTRAINT_RE.match(token):
+                        self._constraints.append(token)
+
+    def _flush_state(self):
+        if self._section == "state" and self._locs is not None:
+            self._trace.add(self._edges, self._delay, self._locs, self._values, self._constraints)
+            self._edges, self._delay = [], None
+        self._locs = None
+        self._values = {}
+        self._constraints = []
+        self._section = None
+
+    def _end_trace(self):
+        if self._trace is not None:
+            self._flush_state()
+            self._trace = None
+            self._edges, self._delay = [], None
+
+    # ---------------------------------------------------------
+    # SUMMARY
+    # ---------------------------------------------------------
+    def finish(self, queries: list[str]) -> str:
+        """
+        Returns the cleaned output followed by one summary per
+        counterexample. Traces are matched to formulas in output order;
+        witnesses of satisfied E<> / E[] properties are dropped.
+        """
+        self._end_trace()
+
+        results = []
+        for line in self.lines:
+            m = _FORMULA_RE.search(line)
+            if m:
+                results.append(m.group(1) is None)
+
+        expected = [
+            i for i, (q, sat) in enumerate(zip(queries, results))
+            if _trace_expected(q, sat)
+        ]
+
+        summaries = []
+        if len(expected) == len(self.traces):
+            for i, trace in zip(expected, self.traces):
+                if results[i]:
+                    continue   # witness, not a counterexample
+                summaries.append(
+                    f"[counterexample] {queries[i]} -- {trace.steps} states, "
+                    "path to the violation:"
+                )
+                summaries += trace.lines()
+        elif self.traces:
+            # Could not match traces to formulas: keep them, unlabelled
+            for n, trace in enumerate(self.traces, start=1):
+                summaries.append(f"[trace {n}] {trace.steps} states:")
+                summaries += trace.lines()
+
+        return "\n".join(self.lines + summaries)
+
+
+def _compact_edge(text: str) -> str:
+    """
+    'P0.idle -> P0.busy { x < 3, go!, x++; }' -> 'P0.idle->P0.busy {x < 3, go!, x++}'
+    with trivial guards / updates ('1', 'tau') left out.
+    """
+    edge, _, labels = text.partition("{")
+    edge = edge.replace(" ", "")
+    labels = [
+        part.strip()
+        for part in labels.rstrip("} ;").split(",")
+        if part.strip() not in ("", "1", "tau", "true")
+    ]
+    if not labels:
+        return edge
+    joined = ", ".join(labels).rstrip(";")
+    if len(joined) > _EDGE_CHARS:
+        joined = joined[:_EDGE_CHARS] + " ..."
+    return f"{edge} {{{joined}}}"
+
+
+# ============================================================
+#                 ATTEMPT-TO-ATTEMPT DIFF
+# ============================================================
+
+def diff_properties(queries: list[str], previous, current) -> str:
+    """
+    Describe how property outcomes changed between two attempts, for the
+    repair prompt. Returns "" when there is nothing to compare.
+    """
+    if previous is None:
+        return ""
+
+    def outcome(props, i):
+        if len(props) != len(queries):
+            return "no result"
+        if props[i] is None:
+            return "unknown"
+        return "SAT" if props[i] else "UNSAT"
+
+    lines, unchanged = [], 0
+    for i, q in enumerate(queries):
+        before, after = outcome(previous, i), outcome(current, i)
+        if before == after:
+            unchanged += 1
+            continue
+        if after == "SAT":
+            note = "fixed, keep this behaviour"
+        elif before == "SAT":
+            note = "REGRESSED by the last repair"
+        else:
+            note = "still failing"
+        lines.append(f"- {q}: {before} -> {after} ({note})")
+
+    if unchanged:
+        lines.append(f"- {unchanged} propert{'y' if unchanged == 1 else 'ies'} unchanged")
+    return "\n".join(lines)
@@ -1,44 +1,147 @@
 # verifyta_runner.py
 
+import asyncio
+import sqlite3
 import subprocess
 import tempfile
+import threading
+import time
 import os
 
-from config import VERIFYTA_PATH
+from config import (
+    VERIFYTA_PATH,
+    VERIFYTA_TRACE,
+    VERIFYTA_PROFILE,
+    SIMULATOR_PRECHECK,
+    ASYNC_VERIFYTA_CONCURRENCY,
+)
+from profiles import PROFILES, AUTO, model_features, get_stats
+from simulator import precheck
+from slicing import slice_queries
+from traces import TraceCollector
 
 
-def run_verifyta(xml_text: str, queries: list[str]):
+# ============================================================
+#                     SHARED HELPERS
+# ============================================================
+
+def _write_inputs(xml_text, queries: list[str]):
     """
-    Writes XML + queries to temp files, executes verifyta,
-    returns (ok, raw_output, property_results).
+    Writes XML + queries to temp files; returns (xml_path, query_path).
+
+    `xml_text` may be str or UTF-8 bytes; bytes are written as-is,
+    without another encode/copy.
     """
+    if isinstance(xml_text, str):
+        xml_text = xml_text.encode("utf-8")
 
     # Write XML safely
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".xml", mode="w", encoding="utf-8") as f_xml:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".xml", mode="wb") as f_xml:
         f_xml.write(xml_text)
         f_xml.flush()
         os.fsync(f_xml.fileno())
         xml_path = f_xml.name
 
-    # Write queries
+    return xml_path, _write_queries(queries)
+
+
+def _write_queries(queries: list[str]):
     with tempfile.NamedTemporaryFile(delete=False, suffix=".q", mode="w", encoding="utf-8") as f_q:
         f_q.write("\n".join(queries))
         f_q.flush()
         os.fsync(f_q.fileno())
-        query_path = f_q.name
+        return f_q.name
+
+
+def _remove_inputs(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
+
+def _command(xml_path, query_path, options=()):
+    cmd = [VERIFYTA_PATH, *options]
+    if VERIFYTA_TRACE:
+        cmd.append(VERIFYTA_TRACE)
+    return cmd + [xml_path, query_path]
+
+
+def _plan(xml_text, queries, profile):
+    """
+    Returns (features, profile names to try in order).
+    """
+    profile = profile or VERIFYTA_PROFILE
+    if profile != AUTO and profile not in PROFILES:
+        raise ValueError(f"Unknown verification profile: {profile}")
+
+    features = model_features(xml_text, queries)
     try:
-        result = subprocess.run(
-            [VERIFYTA_PATH, xml_path, query_path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-    except Exception as e:
-        return False, str(e), []
+        return features, get_stats().plan(profile, features)
+    except (sqlite3.Error, OSError) as e:
+        print(f"[WARN] Profile stats unavailable ({e}); using default order.")
+        return features, get_stats().plan(profile, None)
+
+
+def _record_profile(features, name, elapsed, timed_out):
+    try:
+        get_stats().record(features, name, elapsed, timed_out)
+    except (sqlite3.Error, OSError) as e:
+        print(f"[WARN] Could not record profile stats: {e}")
+
+
+def _profile_note(name, elapsed, timed_out):
+    if timed_out:
+        return f"[profile] {name}: timed out after {elapsed:.1f} s"
+    return f"[profile] {name}: {elapsed:.2f} s"
+
+
+class _Escalation:
+    """
+    Results collected across the profiles of one run_verifyta call.
+
+    verifyta checks the formulas in file order, so a run killed at its
+    timeout has already decided a prefix of the queries; those results
+    are kept and only the remaining queries go to the next profile.
+    """
+
+    def __init__(self, queries):
+        self.remaining = list(queries)
+        self.props = []
+        self.outputs = []
+
+    def killed(self, name, elapsed, raw, props):
+        """
+        Keeps what a killed run reported. Returns True if queries remain.
+        """
+        note = _profile_note(name, elapsed, True)
+        if props:
+            note += f" ({len(props)} of {len(self.remaining)} queries answered)"
+            self.outputs += [note, raw]
+            self.props += props
+            self.remaining = self.remaining[len(props):]
+        else:
+            self.outputs.append(note)
+        return bool(self.remaining)
+
+    def finished(self, name, elapsed, ok, raw, props):
+        self.outputs += [_profile_note(name, elapsed, False), raw]
+        return ok and all(self.props), "\n".join(self.outputs), self.props + props
+
+    def answered(self):
+        # The killed run reported every formula before it was stopped
+        return all(self.props), "\n".join(self.outputs), self.props
+
+    def exhausted(self):
+        self.outputs.append("verifyta timed out with every profile tried.")
+        return False, "\n".join(self.outputs), self.props
 
-    raw_output = result.stdout + result.stderr
 
+def _parse_result(returncode: int, raw_output: str):
+    """
+    Returns (ok, raw_output, property_results) from verifyta's output.
+    """
     # Parse property results
     properties = []
     lines = raw_output.splitlines()
@@ -50,6 +153,301 @@ def run_verifyta(xml_text: str, queries: list[str]):
                 properties.append(True)
 
     # Valid = all properties satisfied + returncode 0
-    ok = result.returncode == 0 and all(properties) if properties else False
+    ok = returncode == 0 and all(properties) if properties else False
 
     return ok, raw_output, properties
+
+
+def _merge_slices(queries, slices, results):
+    """
+    Combine per-slice (ok, raw, props) results into one, in query order.
+    Properties stay aligned with `queries`: a slice that did not report
+    its formulas (syntax error, crash) leaves None for its queries, as
+    for the pre-check's undecided properties.
+    """
+    properties = [None] * len(queries)
+    outputs = []
+    ok = True
+
+    for (_, idxs, procs), (g_ok, g_raw, g_props) in zip(slices, results):
+        scope = "full model" if procs is None else ", ".join(procs)
+        outputs.append(f"# slice: {scope}\n{g_raw}")
+
+        if len(g_props) != len(idxs):
+            ok = False
+            continue
+
+        ok = ok and g_ok
+        for i, p in zip(idxs, g_props):
+            properties[i] = p
+
+    if any(p is None for p in properties):
+        ok = False
+
+    return ok, "\n".join(outputs), properties
+
+
+def _log_slices(queries, slices):
+    for _, idxs, procs in slices:
+        scope = "full model" if procs is None else ", ".join(procs)
+        print(f"[SLICE] {scope} <- {[queries[i] for i in idxs]}")
+
+
+def _precheck_failure(queries, pre):
+    """
+    The in-process explorer only short-circuits failures: if it finds a
+    violated property, the attempt goes straight to repair without a
+    verifyta run. Returns (False, raw_output, properties), with None for
+    the properties it could not decide, or None when nothing failed.
+
+    Its parser is looser than verifyta's, so a model it accepts may still
+    be rejected by verifyta: satisfied results are never final and are
+    always confirmed by verifyta.
+    """
+    if False not in pre:
+        return None
+
+    lines = [
+        f"[pre-check] {q}\n -- Formula is {'satisfied' if r else 'NOT satisfied'}."
+        for q, r in zip(queries, pre)
+        if r is not None
+    ]
+    lines.append("[pre-check] A property is violated; verifyta was not run for this attempt.")
+    return False, "\n".join(lines), list(pre)
+
+
+# ============================================================
+#                     BLOCKING API
+# ============================================================
+
+def _run_profile(xml_path, query_path, queries, settings):
+    """
+    One verifyta run; returns (timed_out, (ok, raw_output, property_results)).
+    A run killed at the profile's timeout reports the formulas it had
+    finished before the kill.
+    """
+    collector = TraceCollector()
+    timed_out = threading.Event()
+
+    with subprocess.Popen(
+        _command(xml_path, query_path, settings["options"]),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        errors="replace",
+    ) as proc:
+        def kill():
+            timed_out.set()
+            proc.kill()
+
+        timer = threading.Timer(settings["timeout"], kill)
+        timer.start()
+        try:
+            for line in proc.stdout:
+                collector.feed(line)
+        finally:
+            timer.cancel()
+
+    return timed_out.is_set(), _parse_result(proc.returncode, collector.finish(queries))
+
+
+def run_verifyta(xml_text, queries: list[str], profile: str = None, record: bool = True):
+    """
+    Writes XML + queries to temp files, executes verifyta,
+    returns (ok, raw_output, property_results).
+
+    `profile` names a verification profile (profiles.PROFILES) or "auto";
+    default VERIFYTA_PROFILE. A run that times out is retried with the
+    next profile of the plan, for the queries it had not answered yet.
+    With record=False (health probes) the runs are not added to the
+    profile stats.
+
+    Output is consumed line by line; counterexample traces appear in
+    raw_output only as bounded summaries (see traces.py).
+    """
+    features, plan = _plan(xml_text, queries, profile)
+    xml_path, query_path = _write_inputs(xml_text, queries)
+    progress = _Escalation(queries)
+
+    try:
+        for name in plan:
+            t0 = time.perf_counter()
+            try:
+                timed_out, (ok, raw, props) = _run_profile(
+                    xml_path, query_path, progress.remaining, PROFILES[name]
+                )
+            except Exception as e:
+                return False, str(e), []
+            elapsed = time.perf_counter() - t0
+
+            if record:
+                _record_profile(features, name, elapsed, timed_out)
+
+            if not timed_out:
+                return progress.finished(name, elapsed, ok, raw, props)
+            if not progress.killed(name, elapsed, raw, props):
+                return progress.answered()
+            if props:
+                _remove_inputs(query_path)
+                query_path = _write_queries(progress.remaining)
+    finally:
+        _remove_inputs(xml_path, query_path)
+
+    return progress.exhausted()
+
+
+def run_verifyta_sliced(xml_text, queries: list[str], profile: str = None):
+    """
+    Same contract as run_verifyta, but each query is checked against the
+    smallest sound sub-network it depends on (see slicing.py).
+    Property results are returned in the original query order.
+    """
+    slices = slice_queries(xml_text, queries)
+
+    if len(slices) == 1 and slices[0][2] is None:
+        return run_verifyta(xml_text, queries, profile)
+
+    _log_slices(queries, slices)
+    results = [run_verifyta(x, [queries[i] for i in idxs], profile) for x, idxs, _ in slices]
+    return _merge_slices(queries, slices, results)
+
+
+def verify_model(xml_text, queries: list[str], profile: str = None):
+    """
+    Pipeline entry point, same contract as run_verifyta (properties the
+    pre-check could not decide are None when it short-circuits).
+
+    On clock-free models the in-process explorer runs first; a property
+    it finds violated fails the attempt without verifyta. Otherwise the
+    queries go through run_verifyta_sliced.
+    """
+    if SIMULATOR_PRECHECK:
+        failed = _precheck_failure(queries, precheck(xml_text, queries))
+        if failed is not None:
+            return failed
+
+    return run_verifyta_sliced(xml_text, queries, profile)
+
+
+# ============================================================
+#                     ASYNCIO API
+# ============================================================
+
+# Caps concurrent verifyta processes per event loop process; jobs beyond
+# that wait here instead of oversubscribing CPU and memory.
+_verifyta_slots = (None, None)
+
+# Trace state lines of large models easily exceed asyncio's 64 KiB default
+_MAX_LINE = 1 << 22
+
+
+def _slots():
+    global _verifyta_slots
+    loop = asyncio.get_running_loop()
+    if _verifyta_slots[0] is not loop:
+        _verifyta_slots = (loop, asyncio.Semaphore(ASYNC_VERIFYTA_CONCURRENCY))
+    return _verifyta_slots[1]
+
+
+async def _run_profile_async(xml_path, query_path, queries, settings):
+    """
+    asyncio counterpart of _run_profile. The process is killed on timeout
+    and when the awaiting task is cancelled.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *_command(xml_path, query_path, settings["options"]),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        limit=_MAX_LINE,
+    )
+
+    collector = TraceCollector()
+
+    async def consume():
+        async for line in proc.stdout:
+            collector.feed(line.decode("utf-8", errors="replace"))
+        await proc.wait()
+
+    timed_out = False
+    try:
+        await asyncio.wait_for(consume(), settings["timeout"])
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        timed_out = True
+    except asyncio.CancelledError:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        raise
+
+    return timed_out, _parse_result(proc.returncode, collector.finish(queries))
+
+
+async def run_verifyta_async(xml_text, queries: list[str], profile: str = None, record: bool = True):
+    """
+    asyncio counterpart of run_verifyta (asyncio.create_subprocess_exec).
+    If the awaiting task is cancelled, the verifyta process is killed.
+    """
+    features, plan = await asyncio.to_thread(_plan, xml_text, queries, profile)
+    # Temp files are fsync'ed: keep that off the event loop
+    xml_path, query_path = await asyncio.to_thread(_write_inputs, xml_text, queries)
+    progress = _Escalation(queries)
+
+    try:
+        for name in plan:
+            async with _slots():
+                t0 = time.perf_counter()
+                try:
+                    timed_out, (ok, raw, props) = await _run_profile_async(
+                        xml_path, query_path, progress.remaining, PROFILES[name]
+                    )
+                except Exception as e:
+                    return False, str(e), []
+                elapsed = time.perf_counter() - t0
+
+            if record:
+                await asyncio.to_thread(_record_profile, features, name, elapsed, timed_out)
+
+            if not timed_out:
+                return progress.finished(name, elapsed, ok, raw, props)
+            if not progress.killed(name, elapsed, raw, props):
+                return progress.answered()
+            if props:
+                _remove_inputs(query_path)
+                query_path = await asyncio.to_thread(_write_queries, progress.remaining)
+    finally:
+        # Runs on cancellation too; unlinking is cheap enough to do inline
+        _remove_inputs(xml_path, query_path)
+
+    return progress.exhausted()
+
+
+async def run_verifyta_sliced_async(xml_text, queries: list[str], profile: str = None):
+    """
+    asyncio counterpart of run_verifyta_sliced; slices run concurrently.
+    """
+    slices = await asyncio.to_thread(slice_queries, xml_text, queries)
+
+    if len(slices) == 1 and slices[0][2] is None:
+        return await run_verifyta_async(xml_text, queries, profile)
+
+    _log_slices(queries, slices)
+    results = await asyncio.gather(
+        *(run_verifyta_async(x, [queries[i] for i in idxs], profile) for x, idxs, _ in slices)
+    )
+    return _merge_slices(queries, slices, results)
+
+
+async def verify_model_async(xml_text, queries: list[str], profile: str = None):
+    """
+    asyncio counterpart of verify_model. The in-process pre-check is CPU
+    bound, so it runs in a worker thread to keep the event loop free.
+    """
+    if SIMULATOR_PRECHECK:
+        pre = await asyncio.to_thread(precheck, xml_text, queries)
+        failed = _precheck_failure(queries, pre)
+        if failed is not None:
+            return failed
+
+    return await run_verifyta_sliced_async(xml_text, queries, profile)
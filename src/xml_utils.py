@@ -3,6 +3,24 @@
 import re
 import xml.etree.ElementTree as ET
 
+from labels import fix_identifier, normalize_model_labels
+
+# Optional fast path: lxml parses/serialises large models noticeably faster
+# and with fewer intermediate copies. ElementTree stays the fallback.
+try:
+    from lxml import etree as LET
+except ImportError:  # pragma: no cover - depends on environment
+    LET = None
+
+HAVE_LXML = LET is not None
+
+if HAVE_LXML:
+    _LXML_PARSER = LET.XMLParser(resolve_entities=False, no_network=True, remove_comments=True)
+    _PARSE_ERRORS = (ET.ParseError, LET.XMLSyntaxError, ValueError)
+else:
+    _LXML_PARSER = None
+    _PARSE_ERRORS = (ET.ParseError,)
+
 
 # ============================================================
 #                     BASIC SANITIZER
@@ -64,7 +82,9 @@ system P;
 #                   LOW LEVEL HELPERS
 # ============================================================
 
-def _strip_doctype_and_header(xml_text: str) -> str:
+def _strip_doctype_and_header(xml_text) -> str:
+    if isinstance(xml_text, bytes):
+        xml_text = xml_text.decode("utf-8", errors="replace")
     lines = []
     for line in xml_text.splitlines():
         s = line.lstrip()
@@ -74,32 +94,42 @@ def _strip_doctype_and_header(xml_text: str) -> str:
     return "\n".join(lines)
 
 
-def _remove_query_blocks(root: ET.Element):
+def _sub_element(parent, tag: str, attrib=None):
     """
-    Strict: remove any <query> junk the LLM might have inserted.
-    Queries are handled externally by .q files.
+    SubElement that works for both ElementTree and lxml parents.
     """
-    for q in list(root.findall("query")):
-        root.remove(q)
-
+    child = parent.makeelement(tag, attrib or {})
+    parent.append(child)
+    return child
 
-# ============================================================
-#                   IDENTIFIER FIXER
-# ============================================================
 
-def _fix_identifier(name: str) -> str:
+def _parse(xml_data):
     """
-    Make name a valid UPPAAL identifier.
+    Parse str or bytes with lxml when available, ElementTree otherwise.
     """
-    if not name:
-        return "X"
+    if HAVE_LXML:
+        if isinstance(xml_data, str):
+            xml_data = xml_data.encode("utf-8")
+        return LET.fromstring(xml_data, _LXML_PARSER)
+    return ET.fromstring(xml_data)
 
-    name = re.sub(r"[^A-Za-z0-9_]", "_", name)
 
-    if not re.match(r"[A-Za-z_]", name[0]):
-        name = "X" + name
+def serialize_xml(root) -> bytes:
+    """
+    Serialise a parsed model as UTF-8 bytes (no XML declaration).
+    """
+    if HAVE_LXML and not isinstance(root, ET.Element):
+        return LET.tostring(root, encoding="utf-8")
+    return ET.tostring(root, encoding="utf-8")
+
 
-    return name
+def _remove_query_blocks(root: ET.Element):
+    """
+    Strict: remove any <query> junk the LLM might have inserted.
+    Queries are handled externally by .q files.
+    """
+    for q in list(root.findall("query")):
+        root.remove(q)
 
 
 # ============================================================
@@ -115,7 +145,7 @@ def _fix_location_names_and_ids(template: ET.Element):
         lid = loc.get("id")
         if not lid:
             lid = f"id{counter}"
-        lid = _fix_identifier(lid)
+        lid = fix_identifier(lid)
         if lid in used_ids:
             lid = f"id{counter}"
         used_ids.add(lid)
@@ -125,53 +155,7 @@ def _fix_location_names_and_ids(template: ET.Element):
         # Fix location name
         nm = loc.find("name")
         if nm is not None and nm.text:
-            nm.text = _fix_identifier(nm.text)
-
-
-# ============================================================
-#            LABEL NORMALISATION (GUARD/SYNC/ASSIGN)
-# ============================================================
-
-def _normalize_guard(label: ET.Element):
-    if label.text:
-        text = re.sub(r"[^A-Za-z0-9_<>=+*/!&| \t-]", "", label.text.strip())
-        label.text = text
-
-
-def _normalize_assignment(label: ET.Element):
-    """
-    Strict normalizer for assignment labels.
-
-    We only keep simple 'var = number' assignments.
-    If we cannot parse it safely, we drop the label entirely
-    to avoid verifyta syntax errors.
-    """
-    txt = (label.text or "").strip()
-    if not txt:
-        label.text = None
-        return
-
-    # Remove semicolons and weird characters
-    txt = txt.replace(";", "")
-    txt = re.sub(r"[^A-Za-z0-9_=+\-*/ \t]", "", txt)
-
-    # Try to match 'var = 123'
-    m = re.match(r"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*=\s*([0-9]+)\s*$", txt)
-    if not m:
-        # Too weird → safer to drop than to break verifyta
-        label.text = None
-        return
-
-    var, val = m.groups()
-    label.text = f"{var} = {val}"
-
-
-def _normalize_sync(label: ET.Element):
-    text = (label.text or "").strip()
-    text = re.sub(r"[^A-Za-z0-9!?_]", "", text)
-    if "!" not in text and "?" not in text:
-        text += "!"
-    label.text = text
+            nm.text = fix_identifier(nm.text)
 
 
 # ============================================================
@@ -186,7 +170,7 @@ def _fix_transitions(template: ET.Element):
         # Fix source
         src = trans.find("source")
         if src is None or not src.get("ref"):
-            new = ET.Element("source", {"ref": first})
+            new = trans.makeelement("source", {"ref": first})
             if src is None:
                 trans.insert(0, new)
             else:
@@ -195,27 +179,12 @@ def _fix_transitions(template: ET.Element):
         # Fix target
         tgt = trans.find("target")
         if tgt is None or not tgt.get("ref"):
-            new = ET.Element("target", {"ref": first})
+            new = trans.makeelement("target", {"ref": first})
             if tgt is None:
                 trans.append(new)
             else:
                 tgt.set("ref", first)
 
-        # Fix labels
-        for label in list(trans.findall("label")):
-            kind = label.get("kind")
-
-            if kind == "guard":
-                _normalize_guard(label)
-            elif kind == "assignment":
-                _normalize_assignment(label)
-            elif kind == "synchronisation":
-                _normalize_sync(label)
-
-            # Drop empty / broken labels
-            if not label.text or not label.text.strip():
-                trans.remove(label)
-
 
 # ============================================================
 #            FIX ENTIRE TEMPLATE BLOCK
@@ -227,14 +196,16 @@ def _fix_template(template: ET.Element):
     - Ensure at least one location
     - Ensure exactly one init
     - Fix IDs and names
-    - Fix transitions (sources/targets/labels)
+    - Fix transitions (sources/targets)
+
+    Labels are normalised for the whole model at once afterwards.
     """
 
     # Ensure at least one location
     locs = template.findall("location")
     if not locs:
-        loc = ET.SubElement(template, "location", {"id": "id0"})
-        nm = ET.SubElement(loc, "name")
+        loc = _sub_element(template, "location", {"id": "id0"})
+        nm = _sub_element(loc, "name")
         nm.text = "S"
         locs = [loc]
 
@@ -246,7 +217,7 @@ def _fix_template(template: ET.Element):
     # Ensure exactly one init
     inits = template.findall("init")
     if len(inits) == 0 and ids:
-        ET.SubElement(template, "init", {"ref": ids[0]})
+        _sub_element(template, "init", {"ref": ids[0]})
     elif len(inits) > 1:
         # keep the first, drop the rest
         for extra in inits[1:]:
@@ -282,7 +253,7 @@ def _ensure_system_block(root: ET.Element, templates):
     if old is not None:
         root.remove(old)
 
-    sys_elem = ET.SubElement(root, "system")
+    sys_elem = _sub_element(root, "system")
 
     # One process
     if len(names) == 1:
@@ -313,7 +284,7 @@ def _ensure_template_name(template: ET.Element, index: int):
     """
     name_elem = template.find("name")
     if name_elem is None:
-        name_elem = ET.SubElement(template, "name")
+        name_elem = _sub_element(template, "name")
         name_elem.text = f"Template{index}"
         return
 
@@ -325,33 +296,25 @@ def _ensure_template_name(template: ET.Element, index: int):
 #    MAIN VALIDATOR — STRICT STRUCTURAL REPAIR + SYSTEM
 # ============================================================
 
-def validate_and_repair_xml(xml_text: str, queries: list[str]) -> str:
+def _repair_tree(xml_data):
     """
-    Strict validator:
-    - requires <nta>
-    - requires at least one <template>
-    - enforces template names
-    - repairs locations, inits, transitions
-    - always rebuilds <system> block
-    - DOES NOT infer declarations from queries (no hard-coding)
+    Parse and structurally repair a model.
+    Returns the repaired root, or None if the input is too broken.
     """
-    if not xml_text:
-        return xml_text
-
     # Parse XML
     try:
-        root = ET.fromstring(xml_text)
-    except ET.ParseError:
+        root = _parse(xml_data)
+    except _PARSE_ERRORS:
         # Try again without XML header / doctype
         try:
-            cleaned = _strip_doctype_and_header(xml_text)
-            root = ET.fromstring(cleaned)
-        except ET.ParseError:
+            cleaned = _strip_doctype_and_header(xml_data)
+            root = _parse(cleaned)
+        except _PARSE_ERRORS:
             # Too broken → let verifyta complain; we don't hallucinate a model
-            return xml_text
+            return None
 
     if root.tag != "nta":
-        return xml_text
+        return None
 
     # Remove any query blocks the LLM might have added
     _remove_query_blocks(root)
@@ -360,16 +323,150 @@ def validate_and_repair_xml(xml_text: str, queries: list[str]) -> str:
     templates = list(root.findall("template"))
     if not templates:
         # No templates at all — too broken to repair meaningfully
-        return xml_text
+        return None
 
     for idx, tmpl in enumerate(templates):
         _ensure_template_name(tmpl, idx)
         _fix_template(tmpl)
 
+    # Normalise guard / sync / assignment labels of all templates in one batch
+    normalize_model_labels(root)
+
     # ALWAYS rebuild system block based on actual template names
     _ensure_system_block(root, templates)
 
     # STRICT: we do NOT try to guess or inject declarations from queries.
     # Whatever declarations the LLM provided are used as-is.
 
-    return ET.tostring(root, encoding="unicode")
+    return root
+
+
+def validate_and_repair_xml_bytes(xml_data, queries: list[str]) -> bytes:
+    """
+    Bytes variant of validate_and_repair_xml.
+
+    Accepts str or bytes and returns UTF-8 bytes, so the model never has
+    to be re-encoded on its way to verifyta (the same bytes are recorded
+    as an artifact, sliced, pre-checked and written to the input file).
+    Unrepairable input is passed through unchanged (as bytes).
+    """
+    if not xml_data:
+        return b""
+
+    root = _repair_tree(xml_data)
+    if root is None:
+        if isinstance(xml_data, str):
+            xml_data = xml_data.encode("utf-8")
+        return xml_data
+
+    return serialize_xml(root)
+
+
+def validate_and_repair_xml(xml_text: str, queries: list[str]) -> str:
+    """
+    Strict validator:
+    - requires <nta>
+    - requires at least one <template>
+    - enforces template names
+    - repairs locations, inits, transitions
+    - always rebuilds <system> block
+    - DOES NOT infer declarations from queries (no hard-coding)
+    """
+    if not xml_text:
+        return xml_text
+
+    root = _repair_tree(xml_text)
+    if root is None:
+        return xml_text
+
+    return serialize_xml(root).decode("utf-8")
+
+
+# ============================================================
+#        MODEL IR (for in-process analysis / simulation)
+# ============================================================
+
+_INSTANCE_RE = re.compile(r"([A-Za-z_][A-Za-z0-9_]*)\s*=\s*([A-Za-z_][A-Za-z0-9_]*)\s*\(\s*\)\s*;")
+
+
+def _text(elem) -> str:
+    return (elem.text or "").strip() if elem is not None else ""
+
+
+def _template_ir(tmpl) -> dict:
+    locations = []
+    index = {}
+    for i, loc in enumerate(tmpl.findall("location")):
+        index[loc.get("id")] = i
+        invariant = ""
+        for label in loc.findall("label"):
+            if label.get("kind") == "invariant":
+                invariant = _text(label)
+        locations.append({
+            "id": loc.get("id"),
+            "name": _text(loc.find("name")) or None,
+            "invariant": invariant,
+            "committed": loc.find("committed") is not None,
+            "urgent": loc.find("urgent") is not None,
+        })
+
+    init = tmpl.find("init")
+    init_ref = init.get("ref") if init is not None else None
+
+    transitions = []
+    for trans in tmpl.findall("transition"):
+        src = trans.find("source")
+        tgt = trans.find("target")
+        labels = {label.get("kind"): _text(label) for label in trans.findall("label")}
+        transitions.append({
+            "source": index.get(src.get("ref")) if src is not None else None,
+            "target": index.get(tgt.get("ref")) if tgt is not None else None,
+            "guard": labels.get("guard", ""),
+            "sync": labels.get("synchronisation", ""),
+            "assignment": labels.get("assignment", ""),
+            "select": labels.get("select", ""),
+        })
+
+    return {
+        "name": _text(tmpl.find("name")),
+        "parameters": _text(tmpl.find("parameter")),
+        "declaration": _text(tmpl.find("declaration")),
+        "locations": locations,
+        "init": index.get(init_ref),
+        "transitions": transitions,
+    }
+
+
+def build_model_ir(xml_data):
+    """
+    Plain-dict intermediate representation of a (repaired) model:
+
+    {
+      "declaration": "<global declarations>",
+      "templates": {name: {"parameters", "declaration", "locations",
+                           "init", "transitions"}},
+      "processes": [(process_name, template_name), ...],
+    }
+
+    Location / source / target references are resolved to indices into
+    the template's "locations" list (None if dangling).
+    Returns None if the XML cannot be parsed.
+    """
+    try:
+        root = _parse(xml_data)
+    except _PARSE_ERRORS:
+        return None
+
+    if root.tag != "nta":
+        return None
+
+    templates = {}
+    for tmpl in root.findall("template"):
+        ir = _template_ir(tmpl)
+        templates[ir["name"]] = ir
+
+    return {
+        "declaration": _text(root.find("declaration")),
+        "templates": templates,
+        "processes": _INSTANCE_RE.findall(_text(root.find("system"))),
+    }